@@ -0,0 +1,202 @@
+import re
+
+from truck import Truck
+from clock import seconds
+
+'''
+Capacitated package-to-truck assignment.
+Packages are grouped by their "Must be delivered with" notes, given a ready time (flight delays
+and wrong-address holds), an optional pinned truck and a deadline, and then clustered onto the
+fleet: deadline groups go to the earliest truck that can still make the deadline, everything else
+is swept from the outside in onto the truck whose cluster is closest.
+'''
+
+DELAYED_NOTE = re.compile(r'delayed on flight.*?until\s+(\d{1,2}):(\d{2})\s*([ap]m)?', re.IGNORECASE)
+TRUCK_NOTE = re.compile(r'can only be on truck\s+(\d+)', re.IGNORECASE)
+WITH_NOTE = re.compile(r'must be delivered with\s+([\d,\s]+)', re.IGNORECASE)
+WRONG_ADDRESS_NOTE = re.compile(r'wrong address', re.IGNORECASE)
+
+# Number of recently assigned stops kept per truck to measure how close a group is to its cluster.
+ANCHORS = 4
+
+
+class PackageConstraints:
+    '''
+    The routing constraints written in a package's notes.
+    '''
+    def __init__(self, truck=None, available_at=None, together=(), wrong_address=False):
+        self.truck = truck                  # Truck number the package must ride on, if any
+        self.available_at = available_at    # Seconds since midnight the package reaches the hub, if delayed
+        self.together = set(together)       # Package IDs that must ride on the same truck
+        self.wrong_address = wrong_address  # Whether the package is held for an address correction
+
+
+'''
+Parses the notes column of a package into PackageConstraints.
+Time & Space Complexity: O(L), where L is the length of the notes.
+'''
+def parse_notes(notes):
+    constraints = PackageConstraints()
+    match = TRUCK_NOTE.search(notes)
+    if match:
+        constraints.truck = int(match.group(1))
+    match = DELAYED_NOTE.search(notes)
+    if match:
+        hour, minute, meridiem = int(match.group(1)), int(match.group(2)), match.group(3)
+        if meridiem and meridiem.lower() == 'pm' and hour != 12:
+            hour += 12
+        constraints.available_at = seconds(hour, minute)
+    match = WITH_NOTE.search(notes)
+    if match:
+        constraints.together = {int(pid) for pid in re.findall(r'\d+', match.group(1))}
+    constraints.wrong_address = bool(WRONG_ADDRESS_NOTE.search(notes))
+    return constraints
+
+
+class PackageGroup:
+    '''
+    Packages that must be loaded onto the same truck, with their combined constraints.
+    '''
+    def __init__(self, packages, stops, truck, ready_time, deadline):
+        self.packages = packages      # Package objects in the group
+        self.stops = stops            # Distinct stop IDs the group delivers to
+        self.truck = truck            # Pinned truck number, or None
+        self.ready_time = ready_time  # Earliest time the whole group can leave the hub
+        self.deadline = deadline      # Earliest deadline in the group, or None
+
+
+'''
+Merges packages linked by "Must be delivered with" notes into PackageGroups using union-find.
+A package flagged with a wrong address is held until its entry in holds (package ID -> seconds
+since midnight), or until address_hold if it has none.
+Time Complexity: O(N α(N)), where N is the number of packages.
+'''
+def build_groups(packages, network, address_hold, holds=None):
+    if holds is None:
+        holds = {}
+    parent = {package.package_id: package.package_id for package in packages}
+
+    def find(pid):
+        while parent[pid] != pid:
+            parent[pid] = parent[parent[pid]]
+            pid = parent[pid]
+        return pid
+
+    constraints = {}
+    for package in packages:
+        constraints[package.package_id] = parse_notes(package.notes)
+        for other in constraints[package.package_id].together:
+            if other in parent:
+                parent[find(other)] = find(package.package_id)
+
+    members = {}
+    for package in packages:
+        members.setdefault(find(package.package_id), []).append(package)
+
+    groups = []
+    for group in members.values():
+        truck = None
+        ready_time = 0
+        deadline = None
+        stops = []
+        for package in group:
+            rules = constraints[package.package_id]
+            if rules.truck is not None:
+                if truck is not None and truck != rules.truck:
+                    raise ValueError('Packages %s are pinned to different trucks'
+                                     % [p.package_id for p in group])
+                truck = rules.truck
+            if rules.available_at is not None:
+                ready_time = max(ready_time, rules.available_at)
+            if rules.wrong_address:
+                ready_time = max(ready_time, holds.get(package.package_id, address_hold))
+            package_deadline = package.deadline
+            if package_deadline is not None and (deadline is None or package_deadline < deadline):
+                deadline = package_deadline
+            stop = network.address_to_id(package.address)
+            if stop is None:
+                raise ValueError('Package %d has an unknown address: %s' % (package.package_id, package.address))
+            if stop not in stops:
+                stops.append(stop)
+        groups.append(PackageGroup(group, stops, truck, ready_time, deadline))
+    return groups
+
+
+'''
+Assigns packages to a fleet and returns the Truck objects, numbered from 1 in departure order.
+- departures: one departure time (seconds since midnight) per truck.
+- holds: package ID -> time a flagged wrong address is corrected; other flagged packages are
+  held until address_hold.
+- Honours truck capacity, pinned trucks, flight delays, wrong-address holds and "Must be
+  delivered with" groups. A deadline group rides the earliest truck whose direct hub-to-stop
+  drive still meets the deadline.
+- The remaining groups are swept from the farthest stop inwards; each goes to the truck whose
+  recent stops (or the hub, for an empty truck) are closest, which keeps clusters compact and
+  the fleet mileage low.
+Raises a ValueError if a group fits no truck at all.
+Time Complexity: O(G * T), where G is the number of groups and T the number of trucks.
+'''
+def assign_packages(packages, network, hub, departures, capacity=16, speed=18,
+                    address_hold=seconds(10, 20), holds=None):
+    hub_id = network.address_to_id(hub)
+    departures = sorted(departures)
+    trucks = [Truck(capacity, 0, speed, [], hub, '', departure) for departure in departures]
+    anchors = [[] for truck in trucks]
+
+    def reachable(truck, group):
+        if group.deadline is None:
+            return True
+        for stop in group.stops:
+            arrival = truck.departure_time + network.distance(hub_id, stop) / speed * 3600
+            if arrival > group.deadline:
+                return False
+        return True
+
+    # Indices of trucks with space left; full trucks drop out so later groups skip them.
+    open_trucks = list(range(len(trucks)))
+
+    def candidates(group):
+        empty_seen = set()
+        for index in open_trucks:
+            truck = trucks[index]
+            if group.truck is not None and group.truck != index + 1:
+                continue
+            if truck.departure_time < group.ready_time:
+                continue
+            if len(truck.packages) + len(group.packages) > truck.capacity:
+                continue
+            # Empty trucks with the same departure are interchangeable; offer only the first.
+            if not truck.packages:
+                if truck.departure_time in empty_seen:
+                    continue
+                empty_seen.add(truck.departure_time)
+            yield index, truck
+
+    def cluster_distance(index, group):
+        points = anchors[index] or [hub_id]
+        return min(network.distance(point, stop) for point in points for stop in group.stops)
+
+    def place(index, group):
+        trucks[index].packages.extend(package.package_id for package in group.packages)
+        anchors[index] = (anchors[index] + group.stops)[-ANCHORS:]
+        if len(trucks[index].packages) >= trucks[index].capacity:
+            open_trucks.remove(index)
+
+    groups = build_groups(packages, network, address_hold, holds)
+    # Tightest constraints first (pinned, deadline, then late-arriving groups that fewer trucks
+    # can take), then the sweep from the outside in.
+    groups.sort(key=lambda group: (group.truck is None, group.deadline is None,
+                                   group.deadline or 0, -group.ready_time,
+                                   -max(network.distance(hub_id, stop) for stop in group.stops)))
+
+    for group in groups:
+        options = list(candidates(group))
+        if not options:
+            raise ValueError('No truck can carry packages %s' % [p.package_id for p in group.packages])
+        if group.deadline is not None:
+            on_time = [option for option in options if reachable(option[1], group)] or options
+            earliest = on_time[0][1].departure_time
+            options = [option for option in on_time if option[1].departure_time == earliest]
+        best = min(options, key=lambda option: cluster_distance(option[0], group))
+        place(best[0], group)
+    return trucks
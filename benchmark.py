@@ -0,0 +1,230 @@
+import argparse
+import csv
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from clock import seconds
+from hashtable import HashTable
+from ingest import load_manifest, load_batch
+from network import load_network
+from assignment import assign_packages
+from dispatch import dispatch
+from optimizer import get_optimizer
+from timeline import Timeline
+
+'''
+Benchmark harness for the routing pipeline.
+Generates a synthetic stop network (distance_table.csv / stops.csv) and package manifest at each
+requested size, then times the loading (as Package objects and as a columnar PackageBatch),
+address lookup, routing and status-query phases separately and reports throughput, peak traced memory and route quality as JSON:
+    python benchmark.py [--sizes 40 1000 10000 100000] [--output report.json]
+'''
+
+HUB = '4001 South 700 East'
+DEPARTURES = (seconds(8, 00), seconds(9, 10), seconds(10, 30))
+
+
+'''
+Writes a synthetic network of the given number of stops to directory.
+Stops are random points in a 12 x 12 mile area; distances are straight-line miles scaled by a
+road factor and rounded to 0.1 mile, written lower-triangular like the real distance table.
+Stop 0 is the hub. Returns the distance file, stops file and the list of stop addresses.
+Time & Space Complexity: O(S^2), where S is the number of stops.
+'''
+def generate_network(directory, stops, seed=0):
+    rng = random.Random(seed)
+    points = [(6.0, 6.0)] + [(rng.uniform(0, 12), rng.uniform(0, 12)) for i in range(stops - 1)]
+    addresses = [HUB] + ['%d Synthetic Ave %d' % (rng.randint(100, 9999), i) for i in range(1, stops)]
+    distance_file = os.path.join(directory, 'distance_table.csv')
+    stops_file = os.path.join(directory, 'stops.csv')
+    with open(distance_file, 'w', newline='') as db:
+        writer = csv.writer(db)
+        for y, (y_x, y_y) in enumerate(points):
+            row = ['%.1f' % (1.3 * math.hypot(y_x - x_x, y_y - x_y)) for x_x, x_y in points[:y + 1]]
+            writer.writerow(row + [''] * (stops - y - 1))
+    with open(stops_file, 'w', newline='') as stop:
+        writer = csv.writer(stop)
+        for stop_id, address in enumerate(addresses):
+            writer.writerow([stop_id, 'Stop %d' % stop_id, ' %s\n(84%03d)' % (address, stop_id % 1000)])
+    return distance_file, stops_file, addresses
+
+
+'''
+Writes a synthetic package manifest in the package_data.csv format.
+Roughly 12% of packages get a 10:30 AM or 9:00 AM deadline; small shares are delayed on a flight,
+pinned to truck 2 (bounded by the capacity of one truck) or linked with "Must be delivered with".
+Time & Space Complexity: O(N)
+'''
+def generate_manifest(path, packages, addresses, capacity, seed=0):
+    rng = random.Random(seed + 1)
+    pinned_left = capacity // 2
+    with open(path, 'w', newline='') as manifest:
+        writer = csv.writer(manifest)
+        package_id = 1
+        while package_id <= packages:
+            roll = rng.random()
+            deadline = '9:00 AM' if roll < 0.02 else '10:30 AM' if roll < 0.12 else 'EOD'
+            roll = rng.random()
+            notes = ''
+            if roll < 0.05:
+                notes = 'Delayed on flight---will not arrive to depot until 9:05 am'
+            elif roll < 0.08 and pinned_left > 0:
+                notes = 'Can only be on truck 2'
+                pinned_left -= 1
+            elif roll < 0.10 and package_id + 2 <= packages:
+                # A group of three that must ride together.
+                group = [package_id, package_id + 1, package_id + 2]
+                for member in group:
+                    others = ', '.join(str(other) for other in group if other != member)
+                    writer.writerow([member, rng.choice(addresses[1:]), 'Salt Lake City', '84115', 'UT',
+                                     deadline, rng.randint(1, 80), 'Must be delivered with ' + others])
+                package_id += 3
+                continue
+            writer.writerow([package_id, rng.choice(addresses[1:]), 'Salt Lake City', '84115', 'UT',
+                             deadline, rng.randint(1, 80), notes])
+            package_id += 1
+    return path
+
+
+class Phase:
+    '''
+    Context manager that records either the wall time of a phase or, with trace_memory, its peak
+    traced memory. The two are never measured together because tracemalloc slows the traced code
+    down several times over.
+    '''
+    def __init__(self, results, name, items, trace_memory):
+        self.results = results
+        self.name = name
+        self.items = items
+        self.trace_memory = trace_memory
+
+    def __enter__(self):
+        if self.trace_memory:
+            tracemalloc.start()
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.started
+        result = self.results.setdefault(self.name, {})
+        if self.trace_memory:
+            result['peak_memory_bytes'] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        else:
+            result['seconds'] = round(elapsed, 6)
+            result['items_per_second'] = round(self.items / elapsed, 1) if elapsed > 0 else None
+        return False
+
+
+'''
+Runs the load, address lookup, routing and status-query phases once on generated files and
+records each phase into phases. Returns the loaded packages, the routed trucks and the rejects.
+'''
+def run_phases(phases, distance_file, stops_file, manifest, departures, capacity, optimizer, time_budget,
+               queries, seed, trace_memory):
+    with Phase(phases, 'load', 0, trace_memory) as phase:
+        network = load_network(distance_file, stops_file)
+        package_table = HashTable()
+        rejects = []
+        loaded = load_manifest(manifest, package_table, rejects)
+        phase.items = len(loaded)
+
+    # The same manifest loaded into the columnar PackageBatch, for comparison with 'load'.
+    with Phase(phases, 'load_batch', len(loaded), trace_memory):
+        load_batch(manifest)
+
+    with Phase(phases, 'address_lookup', len(loaded), trace_memory):
+        for package in loaded:
+            network.address_to_id(package.address)
+
+    with Phase(phases, 'routing', len(loaded), trace_memory):
+        fleet = assign_packages(loaded, network, HUB, departures, capacity)
+        dispatch(fleet, package_table, network, get_optimizer(optimizer, time_budget=time_budget))
+
+    rng = random.Random(seed + 2)
+    ids = [package.package_id for package in loaded]
+    with Phase(phases, 'status_query', queries, trace_memory):
+        timeline = Timeline(loaded)
+        for i in range(queries):
+            timeline.snapshot(rng.choice(ids), rng.randint(seconds(8), seconds(17)))
+        timeline.snapshot_all(seconds(10, 30))
+    return loaded, fleet, rejects
+
+
+'''
+Generates the data for one size and benchmarks each phase.
+The fleet is sized so trucks run about 80% full; trucks depart in three waves.
+Phases are timed with tracing off; with trace_memory the pipeline then runs a second time under
+tracemalloc to measure each phase's peak memory.
+Returns the size's report entry.
+'''
+def run_size(packages, seed=0, optimizer='local', time_budget=0.05, queries=10000, trace_memory=True,
+             capacity=None):
+    stops = min(max(27, packages // 20), 1500)
+    if capacity is None:
+        capacity = 16 if packages <= 100 else 100
+    trucks = max(3, math.ceil(packages / (capacity * 0.8)))
+    departures = [DEPARTURES[number % len(DEPARTURES)] for number in range(trucks)]
+    phases = {}
+    with tempfile.TemporaryDirectory() as directory:
+        distance_file, stops_file, addresses = generate_network(directory, stops, seed)
+        manifest = generate_manifest(os.path.join(directory, 'package_data.csv'), packages, addresses,
+                                     capacity, seed)
+        arguments = (distance_file, stops_file, manifest, departures, capacity, optimizer, time_budget, queries,
+                     seed)
+        loaded, fleet, rejects = run_phases(phases, *arguments, trace_memory=False)
+        if trace_memory:
+            run_phases(phases, *arguments, trace_memory=True)
+
+    missed = sum(1 for package in loaded
+                 if package.deadline is not None and (package.time_delivered is None
+                                                      or package.time_delivered > package.deadline))
+    return {
+        'packages': packages,
+        'stops': stops,
+        'trucks': trucks,
+        'rejected_rows': len(rejects),
+        'phases': phases,
+        'quality': {
+            'total_miles': round(sum(truck.distance for truck in fleet), 1),
+            'missed_deadlines': missed,
+            'undelivered': sum(1 for package in loaded if package.time_delivered is None),
+            'last_delivery': max(package.time_delivered or 0 for package in loaded),
+        },
+    }
+
+
+'''
+Runs the benchmark for every size and returns the full report.
+'''
+def run(sizes, seed=0, optimizer='local', time_budget=0.05, queries=10000, trace_memory=True):
+    return {
+        'python': sys.version.split()[0],
+        'optimizer': optimizer,
+        'time_budget': time_budget,
+        'results': [run_size(size, seed, optimizer, time_budget, queries, trace_memory) for size in sizes],
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the WGUPS routing pipeline on synthetic data.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[40, 1000, 10000, 100000])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--optimizer', default='local')
+    parser.add_argument('--time-budget', type=float, default=0.05, help='route improvement seconds per truck')
+    parser.add_argument('--queries', type=int, default=10000, help='single-package status queries per size')
+    parser.add_argument('--no-memory', action='store_true', help='skip the traced second run (faster, no memory figures)')
+    parser.add_argument('--output', help='write the JSON report here instead of stdout')
+    args = parser.parse_args()
+    report = run(args.sizes, args.seed, args.optimizer, args.time_budget, args.queries, not args.no_memory)
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(report, output, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
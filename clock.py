@@ -0,0 +1,63 @@
+import datetime
+from functools import lru_cache
+
+'''
+Time-of-day helpers.
+All times in the routing pipeline are integer (or, for a truck's running clock, float)
+seconds since midnight; these functions convert at the edges, when reading the manifest or
+user input and when printing.
+'''
+
+# Deadline value used for "EOD" packages.
+EOD = None
+
+
+'''
+Converts hours and minutes to seconds since midnight.
+'''
+def seconds(hours, minutes=0, secs=0):
+    return hours * 3600 + minutes * 60 + secs
+
+
+'''
+Parses a deadline such as "10:30 AM" or "9:05 am" into seconds since midnight.
+Returns EOD (None) for "EOD" or blank values.
+Manifests repeat a handful of deadlines, so results are cached and each distinct value is parsed once.
+Time & Space Complexity: O(1)
+'''
+@lru_cache(maxsize=1024)
+def parse_clock(text):
+    text = text.strip().upper()
+    if text == '' or text == 'EOD':
+        return EOD
+    clock = datetime.datetime.strptime(text, '%I:%M %p')
+    return seconds(clock.hour, clock.minute)
+
+
+'''
+Parses a user-entered "HH:MM:SS" time into seconds since midnight.
+Raises a ValueError for malformed input.
+'''
+def parse_time(text):
+    clock = datetime.datetime.strptime(text, '%H:%M:%S')
+    return seconds(clock.hour, clock.minute, clock.second)
+
+
+'''
+Formats seconds since midnight as "H:MM:SS", matching str(timedelta).
+Returns an empty string for None.
+'''
+def format_seconds(value):
+    if value is None:
+        return ''
+    return str(datetime.timedelta(seconds=round(value)))
+
+
+'''
+Formats a deadline in seconds since midnight back to "10:30 AM", or "EOD".
+'''
+def format_deadline(value):
+    if value is EOD:
+        return 'EOD'
+    hours, minutes = divmod(value // 60, 60)
+    return '%d:%02d %s' % ((hours - 1) % 12 + 1, minutes, 'AM' if hours < 12 else 'PM')
@@ -0,0 +1,147 @@
+import os
+import struct
+
+import instrument
+from netcache import open_network
+from network import Network
+from optimizer import LocalSearch, Route
+from functions import update_info
+from package import PackageStatus
+
+'''
+Routes trucks and writes the results back to the packages.
+Each truck's route depends only on its own packages and the shared distance matrix, so trucks
+can be routed one after another or across a process pool. A network opened from its binary
+cache is mapped by every worker straight from the cache file; any other network's matrix is
+copied once into a shared memory block that every worker maps read-only. Only the packages
+travel with each task.
+'''
+
+# Fewest trucks for which auto mode starts a process pool; below this the pool start-up dominates.
+MIN_PARALLEL_TRUCKS = 8
+
+# The network each pool worker attaches to at start-up.
+_worker_network = None
+_worker_memory = None
+
+
+'''
+Marks a truck's packages as loaded and returns them in manifest order.
+Time & Space Complexity: O(N), where N is the number of packages on the truck.
+'''
+def load_truck(truck, truck_number, package_table):
+    loaded = []
+    for pid in truck.packages:
+        package = package_table.lookup(pid)
+        package.status = PackageStatus.EN_ROUTE
+        package.truck_number = truck_number  # Assign truck number to the package.
+        loaded.append(package)
+    return loaded
+
+
+'''
+Drives a routed truck: applies update_info leg by leg so the truck totals and package
+delivery times match the route.
+Time & Space Complexity: O(N)
+'''
+def apply_route(truck, packages, legs):
+    for package, distance in zip(packages, legs):
+        update_info(truck, package, distance)
+
+
+'''
+Delivers all packages assigned to a given truck.
+For each truck, the function:
+ - Marks packages as "En Route"
+ - Orders the deliveries with the route optimizer (nearest-neighbor, then 2-opt / Or-opt)
+ - Updates the truck and package information accordingly
+Returns the Route that was driven.
+'''
+def deliver(truck, truck_number, package_table, network, optimizer=None):
+    if optimizer is None:
+        optimizer = LocalSearch()
+    undelivered_queue = load_truck(truck, truck_number, package_table)
+    with instrument.stage('route_truck'):
+        route = optimizer.solve(network, network.address_to_id(truck.location), undelivered_queue,
+                                truck.speed, truck.departure_time)
+    apply_route(truck, route.packages, route.legs)
+    return route
+
+
+'''
+Pool initializer: memory-maps the network's binary cache file, sharing its page-cache pages.
+'''
+def _open_network(cache_file):
+    global _worker_network
+    _worker_network = open_network(cache_file)
+
+
+'''
+Pool initializer: maps the shared distance matrix and builds this worker's Network around it.
+'''
+def _attach_network(memory_name, size, dtype, stops):
+    global _worker_network, _worker_memory
+    from multiprocessing import shared_memory
+    _worker_memory = shared_memory.SharedMemory(name=memory_name)
+    matrix = _worker_memory.buf[:size * size * struct.calcsize(dtype)].cast(dtype)
+    _worker_network = Network(size, matrix, stops)
+
+
+'''
+Pool task: routes one truck against the worker's shared network.
+Returns the package IDs in delivery order with the route's stops, legs, mileage and ETAs.
+'''
+def _route_truck(location, packages, speed, departure_time, optimizer):
+    route = optimizer.solve(_worker_network, _worker_network.address_to_id(location), packages,
+                            speed, departure_time)
+    return ([package.package_id for package in route.packages], route.stops, route.legs,
+            route.distance, route.etas, route.start)
+
+
+'''
+Routes every truck and merges the results into the trucks and the package table.
+- trucks: Truck objects, numbered from 1 in list order.
+- parallel: True to use a process pool, False to route serially, None to decide by fleet size.
+Returns the Route of each truck, in truck order.
+Time Complexity: the sum of the per-truck routing costs, divided across the workers when parallel.
+'''
+def dispatch(trucks, package_table, network, optimizer=None, parallel=None, workers=None):
+    if optimizer is None:
+        optimizer = LocalSearch()
+    if parallel is None:
+        parallel = len(trucks) >= MIN_PARALLEL_TRUCKS and (os.cpu_count() or 1) > 1
+    if not parallel:
+        return [deliver(truck, number, package_table, network, optimizer)
+                for number, truck in enumerate(trucks, start=1)]
+
+    # The pool machinery is imported here so serial callers never pay for it.
+    from concurrent.futures import ProcessPoolExecutor
+    from multiprocessing import shared_memory
+    loads = [load_truck(truck, number, package_table) for number, truck in enumerate(trucks, start=1)]
+    memory = None
+    if network.cache_file is not None:
+        initializer, initargs = _open_network, (network.cache_file,)
+    else:
+        matrix = memoryview(network.matrix)
+        dtype = matrix.format
+        matrix = matrix.cast('B')
+        memory = shared_memory.SharedMemory(create=True, size=max(len(matrix), 1))
+        memory.buf[:len(matrix)] = matrix
+        initializer, initargs = _attach_network, (memory.name, network.size, dtype, network.stops)
+    routes = []
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=initializer, initargs=initargs) as pool:
+            futures = [pool.submit(_route_truck, truck.location, loaded, truck.speed,
+                                   truck.departure_time, optimizer)
+                       for truck, loaded in zip(trucks, loads)]
+            for truck, loaded, future in zip(trucks, loads, futures):
+                order, stops, legs, distance, etas, start = future.result()
+                by_id = {package.package_id: package for package in loaded}
+                route = Route([by_id[pid] for pid in order], stops, legs, distance, etas, start)
+                apply_route(truck, route.packages, route.legs)
+                routes.append(route)
+    finally:
+        if memory is not None:
+            memory.close()
+            memory.unlink()
+    return routes
@@ -0,0 +1,225 @@
+import instrument
+from clock import seconds, format_seconds, format_deadline
+from hashtable import HashTable
+from ingest import read_manifest
+from assignment import assign_packages
+from dispatch import dispatch
+from optimizer import DeadlineAware, late_packages
+from replan import Replanner
+from timeline import Timeline
+
+'''
+The importable routing engine.
+plan_day() turns a manifest, a network and a fleet description into a Plan: the loaded packages,
+the trucks and their routes. A Plan answers status queries through a PlanQuery built on the
+delivery timeline. Nothing is loaded or routed at import time, and every call builds fresh
+Package (copying any passed in) and Truck objects, so one process can run any number of plans.
+'''
+
+
+class Fleet:
+    '''
+    Describes the trucks available for a day: the hub they start from, the departure times
+    (seconds since midnight), their capacity and speed, and how long packages flagged with a wrong
+    address are held when no correction for them is supplied.
+    - trucks: the number of trucks, or None to size the fleet from the manifest.
+    '''
+    def __init__(self, hub='4001 South 700 East', departures=(seconds(8, 00), seconds(9, 10), seconds(10, 30)),
+                 capacity=16, speed=18, address_hold=seconds(10, 20), trucks=None):
+        if not departures:
+            raise ValueError('A fleet needs at least one departure time')
+        if capacity < 1 or (trucks is not None and trucks < 1):
+            raise ValueError('A fleet needs at least one truck with room for a package')
+        self.hub = hub
+        self.departures = list(departures)
+        self.capacity = capacity
+        self.speed = speed
+        self.address_hold = address_hold
+        self.trucks = trucks
+
+    '''
+    Returns one departure time per truck for a manifest of package_count packages.
+    Trucks take the departures earliest first; trucks beyond the listed departures leave with
+    the last one, so pinned truck numbers keep their meaning. Without a fixed number of trucks
+    the fleet has one truck per departure, plus as many as the packages need to fit by capacity.
+    Time Complexity: O(T log T), where T is the number of trucks.
+    '''
+    def truck_departures(self, package_count):
+        departures = sorted(self.departures)
+        trucks = self.trucks
+        if trucks is None:
+            trucks = max(len(departures), -(-package_count // self.capacity))
+        return departures[:trucks] + [departures[-1]] * (trucks - len(departures))
+
+
+class PlanQuery:
+    '''
+    Read-only status queries against a Plan's delivery timeline.
+    Times are seconds since midnight; results are PackageSnapshot records.
+    '''
+    def __init__(self, timeline):
+        self.timeline = timeline
+
+    '''
+    Returns the snapshot of one package at the given time, or None for unknown IDs.
+    '''
+    def package(self, package_id, at):
+        return self.timeline.snapshot(package_id, at)
+
+    '''
+    Returns the snapshots of the given package IDs (unknown IDs are skipped).
+    '''
+    def packages(self, package_ids, at):
+        snapshots = (self.timeline.snapshot(package_id, at) for package_id in package_ids)
+        return [snapshot for snapshot in snapshots if snapshot is not None]
+
+    '''
+    Returns the snapshots of every package, ordered by package ID.
+    '''
+    def all(self, at):
+        return self.timeline.snapshot_all(at)
+
+    '''
+    Returns (at hub, en route, delivered) counts at the given time.
+    '''
+    def counts(self, at):
+        return self.timeline.counts(at)
+
+
+class Plan:
+    '''
+    A routed day: the package table, the trucks (numbered from 1), their routes and any manifest
+    rows that were rejected. Address corrections go through apply_address_change, which re-plans
+    only the affected truck; the query timeline is rebuilt lazily afterwards.
+    '''
+    def __init__(self, packages, package_table, trucks, routes, network, rejects, optimizer):
+        self.packages = packages
+        self.package_table = package_table
+        self.trucks = trucks
+        self.routes = routes
+        self.network = network
+        self.rejects = rejects
+        self.replanner = Replanner(trucks, routes, network, optimizer)
+        self._timeline = None
+
+    '''
+    Changes a package's address from effective_time onwards and re-plans its truck.
+    '''
+    def apply_address_change(self, package_id, new_address, effective_time, city=None, zipcode=None, state=None):
+        with instrument.stage('replan'):
+            route = self.replanner.apply_address_change(package_id, new_address, effective_time, city, zipcode,
+                                                        state)
+        self.routes = self.replanner.routes
+        self._timeline = None
+        return route
+
+    '''
+    Returns (package, truck number, ETA, deadline) for every package delivered after its deadline.
+    '''
+    def deadline_violations(self):
+        return [(package, number, eta, deadline) for number, route in enumerate(self.routes, start=1)
+                for package, eta, deadline in late_packages(route)]
+
+    '''
+    Returns the query object for the current plan, building its timeline on first use.
+    '''
+    def query(self):
+        if self._timeline is None:
+            with instrument.stage('timeline'):
+                self._timeline = Timeline(self.packages, self.replanner.address_events)
+        return PlanQuery(self._timeline)
+
+    '''
+    Returns the fleet figures: each truck's departure, distance, run time, package IDs and the
+    IDs of packages delivered after their deadline, plus the combined distance and run time and
+    the number of missed deadlines.
+    '''
+    def summary(self):
+        trucks = []
+        for number, truck in enumerate(self.trucks, start=1):
+            trucks.append({
+                'truck': number,
+                'departure': truck.departure_time,
+                'distance': round(truck.distance, 2),
+                'run_time': round(truck.delivery_time - truck.departure_time),
+                'packages': [package.package_id for package in self.routes[number - 1].packages],
+                'late': [package.package_id for package, eta, deadline in late_packages(self.routes[number - 1])],
+            })
+        return {
+            'trucks': trucks,
+            'total_distance': round(sum(truck['distance'] for truck in trucks), 2),
+            'total_run_time': sum(truck['run_time'] for truck in trucks),
+            'missed_deadlines': sum(len(truck['late']) for truck in trucks),
+        }
+
+
+'''
+Converts a package snapshot to an output record with clock-formatted times.
+'''
+def snapshot_record(snapshot):
+    return {
+        'package_id': snapshot.package_id,
+        'truck': snapshot.truck_number,
+        'status': snapshot.status,
+        'deadline': format_deadline(snapshot.deadline),
+        'time_loaded': format_seconds(snapshot.start_time),
+        'time_delivered': format_seconds(snapshot.time_delivered),
+        'weight': snapshot.weight,
+        'address': snapshot.address,
+        'city': snapshot.city,
+        'zipcode': snapshot.zipcode,
+        'state': snapshot.state,
+    }
+
+
+'''
+Returns the earliest effective time of each corrected package, for holding it at the hub.
+'''
+def correction_holds(corrections):
+    holds = {}
+    for correction in corrections:
+        package_id, effective = correction[0], correction[2]
+        holds[package_id] = min(holds.get(package_id, effective), effective)
+    return holds
+
+
+'''
+Plans a delivery day.
+- manifest: a package_data.csv path, or an iterable of Package objects. Package objects are
+  copied, so the caller's packages are never modified and earlier Plans keep their results.
+- network: a Network (see netcache.default_network / network.load_network).
+- fleet: a Fleet; defaults to the WGUPS fleet of 16-package trucks leaving at 8:00, 9:10 and
+  10:30, with extra trucks added when the manifest does not fit.
+- corrections: (package ID, new address, effective seconds, city, zipcode, state) tuples applied
+  after routing through the re-planner. A package flagged with a wrong address is held at the
+  hub until its earliest correction takes effect.
+Returns a Plan. Invalid manifest rows, including rows whose address matches no stop, are
+collected in Plan.rejects. A passed-in package with an unknown address raises a ValueError.
+'''
+def plan_day(manifest, network, fleet=None, optimizer=None, parallel=None, corrections=()):
+    if fleet is None:
+        fleet = Fleet()
+    if optimizer is None:
+        optimizer = DeadlineAware()
+    corrections = list(corrections)
+    rejects = []
+    with instrument.stage('ingest'):
+        if isinstance(manifest, str):
+            packages = list(read_manifest(manifest, rejects, network))
+        else:
+            packages = [package.copy() for package in manifest]
+            for package in packages:
+                if network.address_to_id(package.address) is None:
+                    raise ValueError('Package %d has an unknown address: %s' % (package.package_id, package.address))
+        package_table = HashTable.from_items((package.package_id, package) for package in packages)
+    instrument.count('manifest.packages', len(packages))
+    instrument.count('manifest.rejected', len(rejects))
+    with instrument.stage('assign'):
+        trucks = assign_packages(packages, network, fleet.hub, fleet.truck_departures(len(packages)), fleet.capacity,
+                                 fleet.speed, fleet.address_hold, correction_holds(corrections))
+    with instrument.stage('dispatch'):
+        routes = dispatch(trucks, package_table, network, optimizer, parallel)
+    plan = Plan(packages, package_table, trucks, routes, network, rejects, optimizer)
+    for correction in corrections:
+        plan.apply_address_change(*correction)
+    return plan
@@ -1,52 +1,147 @@
+# Markers for slots that have never been used and for slots whose item was removed.
+_EMPTY = object()
+_DELETED = object()
+
+# Fibonacci hashing multiplier (2^64 / golden ratio) and the 64-bit word mask.
+_MULTIPLIER = 0x9E3779B97F4A7C15
+_WORD = (1 << 64) - 1
+
+
 class HashTable:
     '''
-    A simple hash table implementation for storing packages.
-    The table is implemented as a list of lists (buckets) to handle collisions.
+    An open-addressing hash table for storing packages.
+    Keys and items live in two flat arrays whose length is a power of two; collisions are
+    resolved by linear probing. Hashes are mixed by Fibonacci hashing before use, so keys that
+    share their low bits (multiples of a large power of two, say) still spread across the table.
+    Removed slots become tombstones so probe chains stay intact,
+    and the table doubles whenever live items plus tombstones pass the load factor.
     '''
-    def __init__(self, size):
-        # Create a list of empty buckets with the given size.
-        self.table = []
-        for i in range(size):
-            self.table.append([])
+    MAX_LOAD = 0.7
+
+    def __init__(self, size=8):
+        # Round the requested size up to a power of two that holds it under the load factor.
+        capacity = 8
+        while capacity * self.MAX_LOAD < size:
+            capacity *= 2
+        self._keys = [_EMPTY] * capacity
+        self._items = [None] * capacity
+        self._shift = 64 - capacity.bit_length() + 1  # Keeps the top log2(capacity) bits of the mix
+        self._count = 0    # Live items
+        self._used = 0     # Live items plus tombstones
+
+    '''
+    Builds a table from (key, item) pairs in one pass, sized up front so it never resizes.
+    Time Complexity: O(N)
+    '''
+    @classmethod
+    def from_items(cls, items):
+        items = list(items)
+        table = cls(size=len(items))
+        for key, item in items:
+            table.insert(key, item)
+        return table
+
+    '''
+    Returns the slot holding key, or the slot where it should be inserted
+    (the first tombstone on the probe path if there is one) when it is absent.
+    Time Complexity: O(1) expected.
+    '''
+    def _probe(self, key):
+        keys = self._keys
+        mask = len(keys) - 1
+        index = (hash(key) * _MULTIPLIER & _WORD) >> self._shift
+        tombstone = None
+        while True:
+            slot_key = keys[index]
+            if slot_key is _EMPTY:
+                return (tombstone if tombstone is not None else index), False
+            if slot_key is _DELETED:
+                if tombstone is None:
+                    tombstone = index
+            elif slot_key == key:
+                return index, True
+            index = (index + 1) & mask
+
+    '''
+    Rebuilds the arrays at the given capacity, dropping tombstones.
+    Time Complexity: O(N)
+    '''
+    def _resize(self, capacity):
+        old_keys, old_items = self._keys, self._items
+        self._keys = [_EMPTY] * capacity
+        self._items = [None] * capacity
+        self._shift = 64 - capacity.bit_length() + 1
+        self._count = 0
+        self._used = 0
+        for key, item in zip(old_keys, old_items):
+            if key is not _EMPTY and key is not _DELETED:
+                self.insert(key, item)
 
     '''
     Inserts an item into the hash table using a hash function.
     If an item with the same key already exists, it is replaced.
     Returns True upon successful insertion.
+    Time Complexity: O(1) amortized.
     '''
     def insert(self, key, item):
-        index = hash(key) % len(self.table)
-        index_list = self.table[index]
-        # Check if the key already exists in the bucket; if so, update it.
-        for key_val in index_list:
-            if key_val[0] == key:
-                key_val[1] = item
-                return True
-        # If not found, create a new key-value pair and append it.
-        key_value = [key, item]
-        index_list.append(key_value)
+        index, found = self._probe(key)
+        if found:
+            self._items[index] = item
+            return True
+        if self._keys[index] is _EMPTY:
+            self._used += 1
+        self._keys[index] = key
+        self._items[index] = item
+        self._count += 1
+        if self._used > len(self._keys) * self.MAX_LOAD:
+            # Grow when live items dominate; otherwise a same-size rebuild clears the tombstones.
+            capacity = len(self._keys)
+            if self._count > capacity * self.MAX_LOAD / 2:
+                capacity *= 2
+            self._resize(capacity)
         return True
 
     '''
     Retrieves an item from the hash table by its key.
     Returns the item if found, otherwise None.
+    Time Complexity: O(1) expected.
     '''
     def lookup(self, key):
-        index = hash(key) % len(self.table)
-        index_list = self.table[index]
-        for key_val in index_list:
-            if key_val[0] == key:
-                return key_val[1]
+        index, found = self._probe(key)
+        if found:
+            return self._items[index]
         return None
 
     '''
     Removes an item from the hash table using its key.
-    If the key is found, the item is removed from its bucket.
+    The slot is marked as a tombstone so later probes continue past it.
+    Time Complexity: O(1) expected.
     '''
     def remove(self, key):
-        index = hash(key) % len(self.table)
-        index_list = self.table[index]
-        for key_val in index_list:
-            if key_val[0] == key:
-                index_list.remove([key_val[0], key_val[1]])
-                return
+        index, found = self._probe(key)
+        if found:
+            self._keys[index] = _DELETED
+            self._items[index] = None
+            self._count -= 1
+
+    def __len__(self):
+        return self._count
+
+    def __contains__(self, key):
+        return self._probe(key)[1]
+
+    '''
+    Iterates over the keys in slot order.
+    '''
+    def __iter__(self):
+        for key in self._keys:
+            if key is not _EMPTY and key is not _DELETED:
+                yield key
+
+    '''
+    Iterates over (key, item) pairs in slot order.
+    '''
+    def items(self):
+        for key, item in zip(self._keys, self._items):
+            if key is not _EMPTY and key is not _DELETED:
+                yield key, item
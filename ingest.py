@@ -0,0 +1,193 @@
+import csv
+import math
+import sys
+from collections import namedtuple
+
+from clock import parse_clock
+from package import Package, PackageBatch, PackageStatus
+
+'''
+Streaming manifest ingestion.
+The manifest is read in a single pass by a generator that validates each row as it goes:
+good rows become Package objects, bad rows go to a reject stream with a reason instead of
+aborting the load. Delta manifests (added, cancelled or corrected packages) are applied to an
+already-loaded store in place.
+'''
+
+# A manifest row that failed validation: the 1-based file line it starts on, the raw row and why.
+Reject = namedtuple('Reject', ['line', 'row', 'reason'])
+
+# Columns in package_data.csv: ID, address, city, zip, state, deadline, weight, notes (optional).
+MANIFEST_COLUMNS = 8
+
+# Delta manifest actions; the action is the first column, followed by the package columns.
+ADD = 'add'
+CANCEL = 'cancel'
+CORRECT = 'correct'
+
+
+'''
+Validates one manifest row and returns a Package.
+Raises a ValueError describing the first problem found.
+Time & Space Complexity: O(1)
+'''
+def parse_row(row):
+    if len(row) < MANIFEST_COLUMNS - 1:
+        raise ValueError('expected %d columns, found %d' % (MANIFEST_COLUMNS, len(row)))
+    if len(row) < MANIFEST_COLUMNS:
+        row = row + [''] * (MANIFEST_COLUMNS - len(row))
+    if not row[0].strip().isdigit():
+        raise ValueError('invalid package ID %r' % row[0])
+    if not row[1].strip():
+        raise ValueError('missing address')
+    try:
+        weight = float(row[6])
+    except ValueError:
+        raise ValueError('invalid weight %r' % row[6])
+    if not math.isfinite(weight):
+        raise ValueError('invalid weight %r' % row[6])
+    if weight < 0:
+        raise ValueError('negative weight %r' % row[6])
+    try:
+        deadline = parse_clock(row[5])
+    except ValueError:
+        raise ValueError('invalid deadline %r' % row[5])
+    return Package(int(row[0]), row[1].strip(), sys.intern(row[2].strip()), sys.intern(row[3].strip()),
+                   sys.intern(row[4].strip()), deadline, weight, row[7], PackageStatus.AT_HUB, None, None)
+
+
+'''
+Reads a manifest in one pass and yields a Package per valid row.
+Invalid rows and repeated package IDs are appended to rejects (any object with an append
+method) as Reject records; when rejects is None they are dropped.
+- network: if given, rows whose address matches no stop in it are rejected as well.
+Time Complexity: O(N); Space Complexity: O(N) for the set of IDs seen.
+'''
+def read_manifest(package_manifest, rejects=None, network=None):
+    seen = set()
+    with open(package_manifest, newline='') as pd:
+        reader = csv.reader(pd)
+        next_line = 1
+        for row in reader:
+            # The file line the row starts on; a quoted field may span several lines.
+            line, next_line = next_line, reader.line_num + 1
+            if not row or not any(field.strip() for field in row):
+                continue
+            try:
+                package = parse_row(row)
+            except ValueError as error:
+                if rejects is not None:
+                    rejects.append(Reject(line, row, str(error)))
+                continue
+            if package.package_id in seen:
+                if rejects is not None:
+                    rejects.append(Reject(line, row, 'duplicate package ID %d' % package.package_id))
+                continue
+            if network is not None and network.address_to_id(package.address) is None:
+                if rejects is not None:
+                    rejects.append(Reject(line, row, 'unknown address %r' % package.address))
+                continue
+            seen.add(package.package_id)
+            yield package
+
+
+'''
+Groups the valid packages of a manifest into lists of at most size packages.
+Time Complexity: O(N); Space Complexity: O(size).
+'''
+def read_batches(package_manifest, size=10000, rejects=None):
+    batch = []
+    for package in read_manifest(package_manifest, rejects):
+        batch.append(package)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+'''
+Loads a manifest into a package table in a single pass.
+Returns the loaded packages in file order.
+Time Complexity: O(N)
+'''
+def load_manifest(package_manifest, package_table, rejects=None):
+    loaded = []
+    for package in read_manifest(package_manifest, rejects):
+        package_table.insert(package.package_id, package)
+        loaded.append(package)
+    return loaded
+
+
+'''
+Loads a manifest into a columnar PackageBatch in a single pass, with the same validation and
+reject handling as read_manifest. Only one Package object exists at a time, so very large
+manifests cost the batch's typed arrays rather than one object per package.
+Time Complexity: O(N)
+'''
+def load_batch(package_manifest, rejects=None):
+    batch = PackageBatch()
+    for package in read_manifest(package_manifest, rejects):
+        batch.append(package)
+    return batch
+
+
+'''
+Applies a delta manifest to an already-loaded package table.
+Each row starts with an action:
+ - add: the package columns of a new package.
+ - cancel: the ID of a package to remove.
+ - correct: the full package columns; the address, deadline, weight and notes replace the
+   stored ones while routing results (status, times, truck) are kept.
+Rows that fail validation or refer to a missing (or, for add, an existing) package go to rejects.
+Returns a dict with the number of packages added, cancelled and corrected.
+Time Complexity: O(D), where D is the number of delta rows.
+'''
+def apply_delta(delta_manifest, package_table, rejects=None):
+    counts = {ADD: 0, CANCEL: 0, CORRECT: 0}
+
+    def reject(line, row, reason):
+        if rejects is not None:
+            rejects.append(Reject(line, row, reason))
+
+    with open(delta_manifest, newline='') as delta:
+        reader = csv.reader(delta)
+        next_line = 1
+        for row in reader:
+            line, next_line = next_line, reader.line_num + 1
+            if not row or not any(field.strip() for field in row):
+                continue
+            action = row[0].strip().lower()
+            if action not in counts:
+                reject(line, row, 'unknown action %r' % row[0])
+                continue
+            if action == CANCEL:
+                if len(row) < 2 or not row[1].strip().isdigit():
+                    reject(line, row, 'invalid package ID')
+                    continue
+                package_id = int(row[1])
+                if package_table.lookup(package_id) is None:
+                    reject(line, row, 'unknown package ID %d' % package_id)
+                    continue
+                package_table.remove(package_id)
+                counts[CANCEL] += 1
+                continue
+            try:
+                package = parse_row(row[1:])
+            except ValueError as error:
+                reject(line, row, str(error))
+                continue
+            existing = package_table.lookup(package.package_id)
+            if action == ADD:
+                if existing is not None:
+                    reject(line, row, 'package ID %d already loaded' % package.package_id)
+                    continue
+                package_table.insert(package.package_id, package)
+            else:
+                if existing is None:
+                    reject(line, row, 'unknown package ID %d' % package.package_id)
+                    continue
+                for field in ('address', 'city', 'zipcode', 'state', 'deadline', 'weight', 'notes'):
+                    setattr(existing, field, getattr(package, field))
+            counts[action] += 1
+    return counts
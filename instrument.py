@@ -0,0 +1,245 @@
+import json
+import time
+import tracemalloc
+
+import functions
+from network import Network, normalize_address
+
+'''
+Built-in instrumentation for the routing pipeline.
+Stage timers (stage('dispatch')) and counters (count('name')) record nothing until enable() is
+called: stage() then hands back one shared no-op context and count() returns at once. The hot
+helpers - Network.distance, Network.address_to_id and functions.distance_between_stops /
+address_to_id - are only wrapped with counting versions while instrumentation is enabled, so a
+disabled run calls the plain functions and pays nothing on the hot path.
+
+capture() additionally runs cProfile and tracemalloc and writes a per-run JSON report.
+Counts cover the current process; trucks routed in a process pool are timed as one stage.
+'''
+
+_enabled = False
+_counters = {}
+_timers = {}     # Stage name -> [calls, total seconds, longest call]
+_originals = {}  # (owner, attribute) -> unwrapped function
+
+
+class _NoStage:
+    '''
+    The context stage() returns while instrumentation is disabled.
+    '''
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_STAGE = _NoStage()
+
+
+class _Stage:
+    '''
+    Times one run of a named stage.
+    '''
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.started
+        timer = _timers.get(self.name)
+        if timer is None:
+            timer = _timers[self.name] = [0, 0.0, 0.0]
+        timer[0] += 1
+        timer[1] += elapsed
+        timer[2] = max(timer[2], elapsed)
+        return False
+
+
+'''
+Returns a context manager that times the enclosed block under the given stage name.
+'''
+def stage(name):
+    if not _enabled:
+        return _NO_STAGE
+    return _Stage(name)
+
+
+'''
+Adds n to a named counter.
+'''
+def count(name, n=1):
+    if _enabled:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+'''
+Returns True while instrumentation is enabled.
+'''
+def enabled():
+    return _enabled
+
+
+'''
+Starts recording and swaps the counting wrappers into the distance and lookup helpers.
+'''
+def enable():
+    global _enabled
+    if _enabled:
+        return
+    _enabled = True
+    _wrap(Network, 'distance', _counted_distance)
+    _wrap(Network, 'address_to_id', _counted_address_to_id)
+    _wrap(functions, 'distance_between_stops', _counted_helper('distance_between_stops'))
+    _wrap(functions, 'address_to_id', _counted_helper('address_to_id'))
+
+
+'''
+Stops recording and restores the unwrapped helpers. Recorded figures are kept until reset().
+'''
+def disable():
+    global _enabled
+    _enabled = False
+    for (owner, attribute), original in _originals.items():
+        setattr(owner, attribute, original)
+    _originals.clear()
+
+
+'''
+Clears every counter and timer.
+'''
+def reset():
+    _counters.clear()
+    _timers.clear()
+
+
+'''
+Replaces owner.attribute with make_wrapper(original), remembering the original for disable().
+'''
+def _wrap(owner, attribute, make_wrapper):
+    original = getattr(owner, attribute)
+    _originals[(owner, attribute)] = original
+    setattr(owner, attribute, make_wrapper(original))
+
+
+'''
+Wrapper factories for the hot helpers; each counts its calls and defers to the original.
+'''
+def _counted_distance(original):
+    def distance(self, x, y):
+        _counters['network.distance'] = _counters.get('network.distance', 0) + 1
+        return original(self, x, y)
+    return distance
+
+
+def _counted_address_to_id(original):
+    # Classifies each lookup by the index that answers it; memoized substring matches count as scans.
+    def address_to_id(self, address):
+        if address in self.exact_index:
+            outcome = 'exact'
+        elif normalize_address(address) in self.normalized_index:
+            outcome = 'normalized'
+        else:
+            outcome = 'scan'
+        stop_id = original(self, address)
+        if stop_id is None:
+            outcome = 'miss'
+        name = 'network.address_to_id.' + outcome
+        _counters[name] = _counters.get(name, 0) + 1
+        return stop_id
+    return address_to_id
+
+
+def _counted_helper(name):
+    def make_wrapper(original):
+        def helper(*args):
+            _counters['functions.' + name] = _counters.get('functions.' + name, 0) + 1
+            return original(*args)
+        return helper
+    return make_wrapper
+
+
+'''
+Returns the recorded figures: counters, per-stage timings (calls, total, mean and longest in
+seconds) and the address lookup hit rates.
+'''
+def report():
+    lookups = {outcome: _counters.get('network.address_to_id.' + outcome, 0)
+               for outcome in ('exact', 'normalized', 'scan', 'miss')}
+    total = sum(lookups.values())
+    return {
+        'counters': dict(sorted(_counters.items())),
+        'stages': {name: {'calls': calls, 'seconds': round(seconds, 6),
+                          'mean_seconds': round(seconds / calls, 6), 'max_seconds': round(longest, 6)}
+                   for name, (calls, seconds, longest) in _timers.items()},
+        'address_lookups': dict(lookups, total=total,
+                                index_hit_rate=round((lookups['exact'] + lookups['normalized']) / total, 4)
+                                if total else None),
+    }
+
+
+class capture:
+    '''
+    Context manager for a fully instrumented run. Enables the counters and timers and, if asked,
+    cProfile and tracemalloc; on exit writes a JSON report to path with the figures from
+    report(), the top functions by cumulative time and the top allocation sites.
+    - top: how many profile and allocation entries to keep.
+    '''
+    def __init__(self, path, profile=True, memory=True, top=25):
+        self.path = path
+        self.profile = profile
+        self.memory = memory
+        self.top = top
+        self.profiler = None
+
+    def __enter__(self):
+        # The profiler is imported here so that plain runs never load it.
+        import cProfile
+        reset()
+        enable()
+        if self.memory:
+            tracemalloc.start()
+        if self.profile:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.started
+        if self.profiler is not None:
+            self.profiler.disable()
+        document = {'seconds': round(elapsed, 6)}
+        document.update(report())
+        if self.profiler is not None:
+            document['profile'] = profile_entries(self.profiler, self.top)
+        if self.memory:
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            document['memory'] = {
+                'current_bytes': current,
+                'peak_bytes': peak,
+                'top_allocations': [{'location': '%s:%d' % (stat.traceback[0].filename, stat.traceback[0].lineno),
+                                     'bytes': stat.size, 'blocks': stat.count}
+                                    for stat in snapshot.statistics('lineno')[:self.top]],
+            }
+        disable()
+        with open(self.path, 'w') as output:
+            json.dump(document, output, indent=2)
+        return False
+
+
+'''
+Returns the profiled functions with the most cumulative time as JSON-ready records.
+'''
+def profile_entries(profiler, top):
+    import pstats
+    stats = pstats.Stats(profiler).stats
+    entries = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)[:top]
+    return [{'function': '%s:%d(%s)' % function, 'calls': calls, 'primitive_calls': primitive,
+             'total_seconds': round(total, 6), 'cumulative_seconds': round(cumulative, 6)}
+            for function, (primitive, calls, total, cumulative, callers) in entries]
@@ -1,105 +1,55 @@
+import argparse
 import csv
-import datetime
-
-from hashtable import HashTable
-from package import Package
-from truck import Truck
-from functions import (distance_between_stops, address_to_id, delivery_status_update,
-                       update_info, reset_packageAddress, update_address)
-
-'''
-Counts the number of packages listed in the package data CSV file.
-Returns the total count which is used to dynamically size the hash table.
-'''
-def count_packages(package_manifest):
-    with open(package_manifest) as file:
-        reader = csv.reader(file)
-        line_count = sum(1 for row in reader)
-    return line_count
-
-'''
-Loads package data from a CSV file into the hash table.
-Each row from the CSV is parsed into a Package object and inserted using the package ID.
-'''
-def load_package_data(package_manifest, hash_name):
-    with open(package_manifest) as pd:
-        package_data = csv.reader(pd)
-        for package in package_data:
-            package_id = int(package[0])
-            package_address = package[1]
-            package_city = package[2]
-            package_zipcode = package[3]
-            package_state = package[4]
-            package_deadline = package[5]
-            package_weight = package[6]
-            package_notes = package[7]
-            package_status = 'Hub'
-            package_time_delivered = ''
-            package_start_time = ''
-            # Create a Package object with the parsed information.
-            package = Package(package_id, package_address, package_city, package_zipcode,
-                              package_state, package_deadline, package_weight,
-                              package_notes, package_status, package_time_delivered, package_start_time)
-            # Insert the package into the hash table.
-            hash_name.insert(package_id, package)
-
-# Get the number of packages from the CSV file.
-package_count = count_packages('programdata/package_data.csv')
-# Create a hash table sized based on the number of packages.
-package_hashTable = HashTable(size=package_count)
-# Load package data into the hash table.
-load_package_data('programdata/package_data.csv', package_hashTable)
-
-'''
-Initialize Truck objects with their respective package lists, starting location, and departure times.
-Each truck is represented with its capacity, distance traveled, speed, list of package IDs, location,
-and time details.
-'''
-truck1 = Truck(16, 0, 18, [12, 13, 14, 15, 16, 19, 20, 25, 29, 30, 31, 34, 37, 40],
-               '4001 South 700 East', '', datetime.timedelta(hours=8, minutes=00))
-truck2 = Truck(16, 0, 18, [9, 1, 2, 3, 4, 5, 6, 7, 8, 10, 11, 18, 36, 38],
-               '4001 South 700 East', '', datetime.timedelta(hours=9, minutes=10))
-truck3 = Truck(16, 0, 18, [17, 21, 22, 23, 24, 26, 27, 28, 32, 33, 35, 39],
-               '4001 South 700 East', '', datetime.timedelta(hours=10, minutes=30))
-
-'''
-Delivers all packages assigned to a given truck.
-For each truck, the function:
- - Marks packages as "En Route"
- - Finds the nearest package delivery location
- - Updates the truck and package information accordingly
-'''
-def deliver(truck, truck_number):
-    undelivered_queue = []
-    # Load all packages assigned to the truck into a working queue.
-    for pid in truck.packages:
-        package = package_hashTable.lookup(pid)
-        package.status = 'Package is En Route'
-        package.truck_number = truck_number  # Assign truck number to the package.
-        undelivered_queue.append(package)
-
-    # Continue delivering until all packages on the truck have been delivered.
-    while len(undelivered_queue) > 0:
-        nearest_distance = float('inf')
-        for package in undelivered_queue:
-            truck_location = truck.location
-            package_delivery_location = package.address
-            # Calculate the distance between the truck's current location and the package delivery address.
-            distance_conv = distance_between_stops(address_to_id(truck_location),
-                                                   address_to_id(package_delivery_location))
-            # Identify the package with the nearest delivery location.
-            if distance_conv <= nearest_distance:
-                nearest_distance = distance_conv
-                next_package = package
-        # Update truck and package details based on the nearest package.
-        update_info(truck, next_package, nearest_distance)
-        # Remove the delivered package from the queue.
-        undelivered_queue.remove(next_package)
-
-# Deliver packages for each truck.
-deliver(truck1, 1)
-deliver(truck2, 2)
-deliver(truck3, 3)
+import json
+import sys
+
+import instrument
+from netcache import load_cached_network
+from engine import Fleet, plan_day, snapshot_record
+from assignment import parse_notes
+from optimizer import OPTIMIZERS, get_optimizer
+from clock import seconds, parse_time, format_seconds, format_deadline
+
+'''
+Command-line entry point.
+Running without arguments starts the interactive menu; the plan, status and report
+subcommands run non-interactively and write JSON or CSV, and serve starts the HTTP status service. Importing this module does nothing:
+the network is opened and the day is planned only when main() runs.
+'''
+
+MANIFEST = 'programdata/package_data.csv'
+DISTANCES = 'programdata/distance_table.csv'
+STOPS = 'programdata/stops.csv'
+
+# The WGUPS manifest lists package 9 with the wrong address until the correction arrives at 10:20 AM.
+# Used when no --correction is given, and only for a package whose notes flag a wrong address.
+CORRECTIONS = [(9, '410 S State St.', seconds(10, 20), 'Salt Lake City', '84111', 'UT')]
+
+'''
+Prints the details of a package snapshot.
+'''
+def print_package(snapshot):
+    print('\n')
+    print(f'Package ID: {snapshot.package_id}')
+    print(f'Truck Number: {snapshot.truck_number}')
+    print(f'Weight: {snapshot.weight:g} | Deadline: {format_deadline(snapshot.deadline)} | Expected Delivery: {format_seconds(snapshot.time_delivered)}')
+    print(f'Current Status: {snapshot.status} | Time Loaded: {format_seconds(snapshot.start_time)}')
+    print(f'Delivery Address: {snapshot.address}, {snapshot.city}, {snapshot.zipcode}, {snapshot.state}')
+
+'''
+Prints the distance and run time of every truck and the fleet totals.
+'''
+def print_trip_information(plan):
+    print('\n====================================')
+    print('Complete Trip Information')
+    print('====================================')
+    for number, truck in enumerate(plan.trucks, start=1):
+        print(('\n' if number > 1 else '') + f'Truck {number} Info: ')
+        print('Total Distance Traveled: ' + str(truck.distance))
+        print('Total Run Time: ' + format_seconds(truck.delivery_time - truck.departure_time))
+    print('\nCombined Trucks Distance: ' + str(round(sum(truck.distance for truck in plan.trucks), 2)))
+    print('Combined Delivery Time: ' + format_seconds(sum(truck.delivery_time - truck.departure_time
+                                                          for truck in plan.trucks)))
 
 '''
 The main program loop acts as a simple command-line GUI.
@@ -108,8 +58,11 @@ Users can:
  2. Check the status of a specific package at a given time.
  3. Check the status of all packages at a given time.
  4. Quit the application.
+Status queries read from the plan's timeline and never modify the packages.
 '''
-class Main:
+def run_menu(plan):
+    query = plan.query()
+    package_count = len(plan.package_table)
     runProgram = True
     while runProgram:
         print('\nWelcome to the WGUPS Routing Program')
@@ -121,62 +74,25 @@ class Main:
         print('(4) Quit the Application')
         print('\n====================================')
         option = input('\nPlease Select an Option: ')
-        
+
         if option == '1':
             # Print detailed trip information for each truck.
-            print('\n====================================')
-            print('Complete Trip Information')
-            print('====================================')
-            print('Truck 1 Info: ')
-            print('Total Distance Traveled: ' + str(truck1.distance))
-            print('Total Run Time: ' + str(truck1.delivery_time - truck1.departure_time))
-            print('\nTruck 2 Info: ')
-            print('Total Distance Traveled: ' + str(truck2.distance))
-            print('Total Run Time: ' + str(truck2.delivery_time - truck2.departure_time))
-            print('\nTruck 3 Info: ')
-            print('Total Distance Traveled: ' + str(truck3.distance))
-            print('Total Run Time: ' + str(truck3.delivery_time - truck3.departure_time))
-            print('\nCombined Trucks Distance: ' + str(round(truck1.distance + truck2.distance + truck3.distance, 2)))
-            print('Combined Delivery Time: ' + str((truck1.delivery_time - truck1.departure_time)
-                                                  + (truck2.delivery_time - truck2.departure_time)
-                                                  + (truck3.delivery_time - truck3.departure_time)))
-        
+            print_trip_information(plan)
+
         elif option == '2':
             # Check the status of a single package at a given time.
             try:
                 print('\n')
                 user_package = int(input(f'Please enter a valid Package ID (0 to {package_count - 1}): '))
                 user_time = input('Please enter a time in HH:MM:SS format: ')
-                if user_package < 0 or user_package >= package_count:
-                    print(f'Invalid Package ID. Please try again.')
-                else:
-                    user_time_datetime = datetime.datetime.strptime(user_time, '%H:%M:%S')
-                    user_time_delta = datetime.timedelta(hours=user_time_datetime.hour,
-                                                         minutes=user_time_datetime.minute,
-                                                         seconds=user_time_datetime.second)
-                    print(f'\nPackage ID: {user_package} at Time: {user_time_delta}')
-                    package_gui = package_hashTable.lookup(user_package)
-                    
-                    # Correct the package address if needed.
-                    reset_packageAddress(package_gui, 9)
-                    update_address(user_time_delta, package_gui)
-                    
-                    # Convert time strings to time deltas for comparison.
-                    t = datetime.datetime.strptime(package_gui.time_delivered, '%H:%M:%S') if package_gui.time_delivered else datetime.datetime.min
-                    time_delivered_delta = datetime.timedelta(hours=t.hour, minutes=t.minute, seconds=t.second)
-                    start_time_minutes = int(package_gui.start_time / datetime.timedelta(minutes=1)) if package_gui.start_time else 0
-                    user_time_minutes = int(user_time_delta / datetime.timedelta(minutes=1))
-                    time_delivered_minutes = int(time_delivered_delta / datetime.timedelta(minutes=1))
-                    
-                    # Update the package's delivery status based on the times.
-                    delivery_status_update(start_time_minutes, user_time_minutes, time_delivered_minutes, package_gui)
-                    # Print package information.
-                    print('\n')
-                    print(f'Package ID: {package_gui.package_id}')
-                    print(f'Truck Number: {package_gui.truck_number}')
-                    print(f'Weight: {package_gui.weight} | Deadline: {package_gui.deadline} | Expected Delivery: {package_gui.time_delivered}')
-                    print(f'Current Status: {package_gui.status} | Time Loaded: {package_gui.start_time}')
-                    print(f'Delivery Address: {package_gui.address}, {package_gui.city}, {package_gui.zipcode}, {package_gui.state}')
+                user_seconds = parse_time(user_time)
+                with instrument.stage('render'):
+                    snapshot = query.package(user_package, user_seconds)
+                    if snapshot is None:
+                        print(f'Invalid Package ID. Please try again.')
+                    else:
+                        print(f'\nPackage ID: {user_package} at Time: {format_seconds(user_seconds)}')
+                        print_package(snapshot)
             except ValueError:
                 print('Invalid input. Please enter a valid Package ID and time in HH:MM:SS format.')
 
@@ -184,39 +100,215 @@ class Main:
             # Check the status of all packages at a given time.
             try:
                 user_time = input('Please enter the time in HH:MM:SS format: ')
-                user_time_datetime = datetime.datetime.strptime(user_time, '%H:%M:%S')
-                user_time_delta = datetime.timedelta(hours=user_time_datetime.hour,
-                                                     minutes=user_time_datetime.minute,
-                                                     seconds=user_time_datetime.second)
+                user_seconds = parse_time(user_time)
                 print(f'\nStatus of all packages at {user_time}:')
-                # Iterate over all possible package IDs.
-                for i in range(1, len(package_hashTable.table) + 1):
-                    package_gui = package_hashTable.lookup(i)
-                    if package_gui is not None:
-                        reset_packageAddress(package_gui, 9)
-                        update_address(user_time_delta, package_gui)
-                        
-                        t = datetime.datetime.strptime(package_gui.time_delivered, '%H:%M:%S') if package_gui.time_delivered else datetime.datetime.min
-                        time_delivered_delta = datetime.timedelta(hours=t.hour, minutes=t.minute, seconds=t.second)
-                        start_time_minutes = int(package_gui.start_time / datetime.timedelta(minutes=1)) if package_gui.start_time else 0
-                        user_time_minutes = int(user_time_delta / datetime.timedelta(minutes=1))
-                        time_delivered_minutes = int(time_delivered_delta / datetime.timedelta(minutes=1))
-                        
-                        delivery_status_update(start_time_minutes, user_time_minutes, time_delivered_minutes, package_gui)
-                        # Print package details.
-                        print('\n')
-                        print(f'Package ID: {package_gui.package_id}')
-                        print(f'Truck Number: {package_gui.truck_number}')
-                        print(f'Weight: {package_gui.weight} | Deadline: {package_gui.deadline} | Expected Delivery: {package_gui.time_delivered}')
-                        print(f'Current Status: {package_gui.status} | Time Loaded: {package_gui.start_time}')
-                        print(f'Delivery Address: {package_gui.address}, {package_gui.city}, {package_gui.zipcode}, {package_gui.state}')
+                with instrument.stage('render'):
+                    for snapshot in query.all(user_seconds):
+                        print_package(snapshot)
             except ValueError:
                 print('Invalid input. Please enter a time in HH:MM:SS format.')
-        
+
         elif option == '4':
             # Exit the application.
             print('The Application is now terminating. Goodbye!')
             runProgram = False
-        
+
         else:
             print('Invalid option. Please try again.')
+
+'''
+Writes a list of flat records as JSON or CSV.
+JSON output may carry extra top-level data; CSV writes only the records.
+'''
+def write_records(records, output_format, output, extra=None):
+    if output_format == 'json':
+        document = dict(extra or {}, records=records)
+        json.dump(document, output, indent=2)
+        output.write('\n')
+        return
+    writer = csv.writer(output)
+    if records:
+        writer.writerow(list(records[0]))
+    for record in records:
+        writer.writerow(list(record.values()))
+
+'''
+Builds the argument parser for the batch subcommands.
+'''
+def build_parser():
+    parser = argparse.ArgumentParser(description='WGUPS routing program.')
+    parser.add_argument('--manifest', default=MANIFEST, help='package manifest CSV')
+    parser.add_argument('--distances', default=DISTANCES, help='distance table CSV')
+    parser.add_argument('--stops', default=STOPS, help='stops CSV')
+    parser.add_argument('--parallel', action='store_true', help='route trucks across a process pool')
+    parser.add_argument('--optimizer', choices=sorted(OPTIMIZERS), default='deadline',
+                        help='route optimizer (default: deadline-aware)')
+    parser.add_argument('--trucks', type=int,
+                        help='number of trucks (default: one per departure, more if the manifest needs them)')
+    parser.add_argument('--departures', metavar='HH:MM:SS,...',
+                        help='comma-separated truck departure times (default: 08:00:00,09:10:00,10:30:00); '
+                             'trucks beyond these leave with the last one')
+    parser.add_argument('--capacity', type=int, default=16, help='packages per truck (default: 16)')
+    parser.add_argument('--correction', nargs=3, action='append', metavar=('ID', 'ADDRESS', 'HH:MM:SS'),
+                        help='change a package\'s address from the given time (repeatable)')
+    parser.add_argument('--corrections', metavar='CSV',
+                        help='address corrections file with rows: ID, address, HH:MM:SS[, city, zipcode, state]')
+    parser.add_argument('--metrics', action='store_true', help='print stage timings and helper call counts to stderr')
+    parser.add_argument('--profile', metavar='REPORT',
+                        help='run under cProfile and tracemalloc and write a JSON report here')
+    subcommands = parser.add_subparsers(dest='command')
+    for name, text in (('plan', 'plan the day and list every package\'s truck and delivery time'),
+                       ('status', 'show package status at a given time'),
+                       ('report', 'show the fleet distance and run-time summary')):
+        command = subcommands.add_parser(name, help=text)
+        command.add_argument('--format', choices=('json', 'csv'), default='json')
+        command.add_argument('--output', help='write here instead of stdout')
+        if name == 'status':
+            command.add_argument('--at', required=True, help='time in HH:MM:SS format')
+            command.add_argument('--package', type=int, nargs='+', help='package IDs (default: all)')
+    serve = subcommands.add_parser('serve', help='serve package status over HTTP')
+    serve.add_argument('--host', default='127.0.0.1')
+    serve.add_argument('--port', type=int, default=8080)
+    return parser
+
+'''
+Converts one --correction option or corrections file row to a plan_day correction tuple.
+Raises a ValueError for a malformed correction.
+'''
+def parse_correction(values):
+    if len(values) not in (3, 6):
+        raise ValueError('A correction is ID, address, HH:MM:SS and optionally city, zipcode, state: %s'
+                         % ', '.join(values))
+    try:
+        package_id = int(values[0])
+        effective = parse_time(values[2].strip())
+    except ValueError:
+        raise ValueError('A correction needs a numeric package ID and a time in HH:MM:SS format: %s'
+                         % ', '.join(values))
+    return (package_id, values[1].strip(), effective) + tuple(value.strip() for value in values[3:])
+
+'''
+Parses the arguments and runs the program, optionally instrumented.
+Returns the process exit status.
+'''
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    at = None
+    if args.command == 'status':
+        try:
+            at = parse_time(args.at)
+        except ValueError:
+            parser.error('--at must be a time in HH:MM:SS format')
+    corrections = None
+    if args.correction is not None or args.corrections is not None:
+        rows = list(args.correction or [])
+        try:
+            if args.corrections is not None:
+                with open(args.corrections, newline='') as source:
+                    rows.extend(row for row in csv.reader(source) if row)
+            corrections = [parse_correction(row) for row in rows]
+        except (OSError, ValueError) as error:
+            parser.error(str(error))
+    args.correction = corrections
+    departures = Fleet().departures
+    if args.departures:
+        try:
+            departures = [parse_time(text.strip()) for text in args.departures.split(',') if text.strip()]
+        except ValueError:
+            parser.error('--departures must be times in HH:MM:SS format')
+    try:
+        args.fleet = Fleet(departures=departures, capacity=args.capacity, trucks=args.trucks)
+    except ValueError as error:
+        parser.error(str(error))
+    if args.profile:
+        with instrument.capture(args.profile):
+            return run(args, at)
+    if not args.metrics:
+        return run(args, at)
+    instrument.enable()
+    try:
+        return run(args, at)
+    finally:
+        instrument.disable()
+        print(json.dumps(instrument.report(), indent=2), file=sys.stderr)
+
+'''
+Plans the day and runs the interactive menu or the requested subcommand.
+'''
+def run(args, at):
+    with instrument.stage('network'):
+        network = load_cached_network(args.distances, args.stops)
+    try:
+        plan = plan_day(args.manifest, network, args.fleet, optimizer=get_optimizer(args.optimizer),
+                        parallel=args.parallel or None, corrections=args.correction or ())
+    except ValueError as error:
+        print(f'Cannot plan the day: {error}', file=sys.stderr)
+        return 1
+    for reject in plan.rejects:
+        print(f'Skipped manifest line {reject.line}: {reject.reason}', file=sys.stderr)
+    if args.correction is None:
+        for correction in CORRECTIONS:
+            package = plan.package_table.lookup(correction[0])
+            if package is not None and parse_notes(package.notes).wrong_address:
+                plan.apply_address_change(*correction)
+    corrected = {event[0] for event in plan.replanner.address_events}
+    for package in plan.packages:
+        if package.package_id not in corrected and parse_notes(package.notes).wrong_address:
+            print(f'Package {package.package_id} is listed with a wrong address and no correction was given',
+                  file=sys.stderr)
+    for package, number, eta, deadline in plan.deadline_violations():
+        print(f'Package {package.package_id} on truck {number} misses its {format_deadline(deadline)} deadline '
+              f'(delivered {format_seconds(eta)})', file=sys.stderr)
+
+    if args.command is None:
+        run_menu(plan)
+        return 0
+    if args.command == 'serve':
+        # Imported here so the other commands do not load asyncio.
+        import asyncio
+        from service import serve
+        try:
+            asyncio.run(serve(plan, args.host, args.port))
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    output = open(args.output, 'w', newline='') if args.output else sys.stdout
+    try:
+        with instrument.stage('render'):
+            write_command(plan, args, at, output)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    return 0
+
+'''
+Writes the output of the plan, status or report subcommand.
+'''
+def write_command(plan, args, at, output):
+    if args.command == 'plan':
+        records = [snapshot_record(snapshot) for snapshot in plan.query().all(seconds(23, 59, 59))]
+        for record in records:
+            del record['status']
+        write_records(records, args.format, output, {'summary': plan.summary()})
+    elif args.command == 'status':
+        query = plan.query()
+        snapshots = query.packages(args.package, at) if args.package else query.all(at)
+        at_hub, en_route, delivered = query.counts(at)
+        write_records([snapshot_record(snapshot) for snapshot in snapshots], args.format, output,
+                      {'at': args.at, 'at_hub': at_hub, 'en_route': en_route, 'delivered': delivered})
+    else:
+        summary = plan.summary()
+        records = [{'truck': truck['truck'], 'departure': format_seconds(truck['departure']),
+                    'distance': truck['distance'], 'run_time': format_seconds(truck['run_time']),
+                    'packages': len(truck['packages']), 'late': len(truck['late'])}
+                   for truck in summary['trucks']]
+        write_records(records, args.format, output,
+                      {'total_distance': summary['total_distance'],
+                       'total_run_time': format_seconds(summary['total_run_time']),
+                       'missed_deadlines': summary['missed_deadlines']})
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,211 @@
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from array import array
+
+from network import Network, load_network
+
+'''
+Precompiled binary network cache.
+compile_network() parses distance_table.csv and stops.csv once and writes a versioned binary
+file: a fixed header, the stop list as JSON, and the full distance matrix as a float32 or
+float64 block. open_network() memory-maps that file read-only, so start-up does no parsing and
+every routing process on the host shares the same page-cache pages instead of holding a copy.
+
+File layout (header little-endian, matrix in the host's native byte order):
+    header   magic, version, dtype, stop count, source size, source mtime, source SHA-256,
+             stops block length, matrix offset
+    stops    UTF-8 JSON list of [stop ID, name, address]
+    matrix   stop count * stop count floats, row-major, 8-byte aligned
+'''
+
+MAGIC = b'WGUPSNET'
+VERSION = 1
+HEADER = struct.Struct('<8sHcxIQQ32sQQ')
+
+# The cache is kept next to the source CSVs under this name.
+CACHE_NAME = 'network.bin'
+
+
+'''
+Returns the cache file path for a distance table: network.bin in the table's directory.
+'''
+def cache_path(distance_file):
+    return os.path.join(os.path.dirname(distance_file), CACHE_NAME)
+
+
+'''
+Returns the combined size and latest modification time of the source CSVs.
+Used as a cheap pre-check before hashing.
+'''
+def source_stat(distance_file, stops_file):
+    size = 0
+    mtime = 0
+    for path in (distance_file, stops_file):
+        stat = os.stat(path)
+        size += stat.st_size
+        mtime = max(mtime, stat.st_mtime_ns)
+    return size, mtime
+
+
+'''
+Returns the SHA-256 digest of the source CSVs, read in 1 MB chunks.
+Time Complexity: O(S), where S is the combined file size.
+'''
+def source_hash(distance_file, stops_file):
+    digest = hashlib.sha256()
+    for path in (distance_file, stops_file):
+        with open(path, 'rb') as source:
+            for chunk in iter(lambda: source.read(1 << 20), b''):
+                digest.update(chunk)
+        digest.update(b'\0')
+    return digest.digest()
+
+
+'''
+Parses the distance table and stop list and writes them to a binary cache file.
+- cache_file: defaults to network.bin next to the distance table.
+- dtype: 'd' for float64 or 'f' for float32 (half the size, about 7 significant digits).
+The file is written to a uniquely named temporary file in the same directory and renamed into
+place, so readers never see a partial file and concurrent compiles never share a temporary.
+Time & Space Complexity: O(N^2)
+'''
+def compile_network(distance_file, stops_file, cache_file=None, dtype='d'):
+    if dtype not in ('d', 'f'):
+        raise ValueError('dtype must be "d" or "f"')
+    if cache_file is None:
+        cache_file = cache_path(distance_file)
+    network = load_network(distance_file, stops_file)
+    size, mtime = source_stat(distance_file, stops_file)
+    stops = json.dumps([list(stop) for stop in network.stops]).encode('utf-8')
+    offset = HEADER.size + len(stops)
+    offset += -offset % 8
+    header = HEADER.pack(MAGIC, VERSION, dtype.encode(), network.size, size, mtime,
+                         source_hash(distance_file, stops_file), len(stops), offset)
+    matrix = memoryview(network.matrix)
+    if dtype != matrix.format:
+        matrix = memoryview(array(dtype, matrix))
+    descriptor, temporary = tempfile.mkstemp(prefix=os.path.basename(cache_file) + '.',
+                                             dir=os.path.dirname(cache_file) or '.')
+    try:
+        with os.fdopen(descriptor, 'wb') as cache:
+            cache.write(header)
+            cache.write(stops)
+            cache.write(b'\0' * (offset - HEADER.size - len(stops)))
+            cache.write(matrix.cast('B'))
+        os.chmod(temporary, 0o644)  # mkstemp creates the file readable by its owner only
+        os.replace(temporary, cache_file)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+    return cache_file
+
+
+'''
+Reads and validates a cache file's header.
+Returns the unpacked header fields, or raises a ValueError for a foreign or outdated file.
+'''
+def read_header(mapping):
+    if len(mapping) < HEADER.size:
+        raise ValueError('Network cache is truncated')
+    fields = HEADER.unpack_from(mapping, 0)
+    if fields[0] != MAGIC:
+        raise ValueError('Not a network cache file')
+    if fields[1] != VERSION:
+        raise ValueError('Network cache version %d is not supported' % fields[1])
+    return fields
+
+
+'''
+Memory-maps a compiled cache file and returns a Network whose matrix is a read-only view of
+the mapped pages. Only the stop list is decoded; the matrix is never copied.
+Time Complexity: O(N) for the stop index; the matrix is paged in on demand.
+'''
+def open_network(cache_file):
+    with open(cache_file, 'rb') as cache:
+        mapping = mmap.mmap(cache.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, version, dtype, size, source_size, mtime, digest, stops_length, offset = read_header(mapping)
+    stops = [tuple(stop) for stop in json.loads(mapping[HEADER.size:HEADER.size + stops_length].decode('utf-8'))]
+    width = 8 if dtype == b'd' else 4
+    end = offset + size * size * width
+    if len(mapping) < end:
+        raise ValueError('Network cache is truncated')
+    # The memoryview keeps the mapping alive for as long as the network uses it.
+    matrix = memoryview(mapping)[offset:end].cast(dtype.decode())
+    network = Network(size, matrix, stops)
+    # Recorded so that process pools can map the same file instead of copying the matrix.
+    network.cache_file = os.path.abspath(cache_file)
+    return network
+
+
+'''
+Returns True if the cache file exists and was compiled from the current source CSVs, with the
+given dtype if one is given.
+Matching size and modification time are trusted; otherwise the sources are hashed and compared.
+'''
+def cache_is_current(cache_file, distance_file, stops_file, dtype=None):
+    if not os.path.exists(cache_file):
+        return False
+    try:
+        with open(cache_file, 'rb') as cache:
+            fields = read_header(cache.read(HEADER.size))
+    except ValueError:
+        return False
+    if dtype is not None and fields[2] != dtype.encode():
+        return False
+    if (fields[4], fields[5]) == source_stat(distance_file, stops_file):
+        return True
+    return fields[6] == source_hash(distance_file, stops_file)
+
+
+'''
+Opens the network from its binary cache, compiling the cache first if it is missing, stale or
+holds a different dtype.
+The cache defaults to network.bin next to the distance table. A cache that cannot be opened
+(truncated or corrupt) is compiled again; if the cache cannot be written either (e.g. a
+read-only directory) the CSVs are parsed directly.
+'''
+def load_cached_network(distance_file='programdata/distance_table.csv', stops_file='programdata/stops.csv',
+                        cache_file=None, dtype='d'):
+    if cache_file is None:
+        cache_file = cache_path(distance_file)
+    if cache_is_current(cache_file, distance_file, stops_file, dtype):
+        try:
+            return open_network(cache_file)
+        except (OSError, ValueError):
+            pass
+    try:
+        compile_network(distance_file, stops_file, cache_file, dtype)
+        return open_network(cache_file)
+    except (OSError, ValueError):
+        return load_network(distance_file, stops_file)
+
+
+_default_network = None
+
+'''
+Returns the network for programdata/, opening (and if needed compiling) its cache on first use.
+Time Complexity: O(1) after the first call.
+'''
+def default_network():
+    global _default_network
+    if _default_network is None:
+        _default_network = load_cached_network()
+    return _default_network
+
+
+'''
+Compiles the network cache from the command line:
+    python netcache.py [distance_table.csv stops.csv cache.bin] [--float32]
+'''
+if __name__ == '__main__':
+    arguments = [argument for argument in sys.argv[1:] if argument != '--float32']
+    if arguments:
+        distance_file, stops_file, cache_file = arguments
+    else:
+        distance_file, stops_file, cache_file = 'programdata/distance_table.csv', 'programdata/stops.csv', None
+    print(compile_network(distance_file, stops_file, cache_file, 'f' if '--float32' in sys.argv else 'd'))
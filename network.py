@@ -0,0 +1,119 @@
+import csv
+from array import array
+
+'''
+Normalizes an address for lookups.
+Lowercases, strips surrounding whitespace and trailing periods, drops any zip code line
+(stops.csv stores addresses as "street\n(zip)") and collapses repeated spaces.
+Time & Space Complexity: O(L), where L is the length of the address.
+'''
+def normalize_address(address):
+    street = address.strip().split('\n')[0]
+    return ' '.join(street.lower().rstrip('.').split())
+
+
+class Network:
+    '''
+    The delivery network loaded into memory once.
+    Holds the full symmetric distance matrix as a dense, flat float array (row-major,
+    size * size entries) and an address -> stop ID index keyed by both the exact and
+    the normalized address text.
+    '''
+    def __init__(self, size, matrix, stops):
+        self.size = size          # Number of stops in the network
+        self.matrix = matrix      # Flat row-major distance matrix (size * size floats)
+        self.stops = stops        # List of (stop ID, name, address) rows from stops.csv
+        self.cache_file = None    # Binary cache the matrix is mapped from (set by netcache.open_network)
+        self.exact_index = {}     # Street line of the address (as manifests write it) -> stop ID
+        self.normalized_index = {}  # Normalized address -> stop ID
+        self.fallback_index = {}  # Addresses resolved by substring match -> stop ID (memoized)
+        for stop_id, name, address in stops:
+            # stops.csv stores " street\n(zip)"; manifests only ever give the street.
+            self.exact_index.setdefault(address.strip().split('\n')[0].strip(), stop_id)
+            self.normalized_index.setdefault(normalize_address(address), stop_id)
+
+    '''
+    Returns the distance between two stop IDs.
+    Time & Space Complexity: O(1)
+    '''
+    def distance(self, x, y):
+        return self.matrix[x * self.size + y]
+
+    '''
+    Converts an address to its stop ID.
+    Tries the exact index, then the normalized index, and finally falls back to the
+    substring match the CSV scan used to do. Fallback results are memoized separately, so
+    every address pays for the scan at most once and resolve_address never sees them.
+    Time Complexity: O(1) for known addresses, O(N) the first time an unknown one is seen.
+    '''
+    def address_to_id(self, address):
+        stop_id = self.exact_index.get(address)
+        if stop_id is not None:
+            return stop_id
+        key = normalize_address(address)
+        stop_id = self.normalized_index.get(key)
+        if stop_id is not None:
+            return stop_id
+        stop_id = self.fallback_index.get(address)
+        if stop_id is None:
+            for row_id, name, stop_address in self.stops:
+                if address in stop_address or key in normalize_address(stop_address):
+                    stop_id = row_id
+                    break
+            if stop_id is None:
+                return None
+            self.fallback_index[address] = stop_id
+        return stop_id
+
+    '''
+    Converts an address to its stop ID by exact or normalized match only, or returns None.
+    Used to validate new addresses, where the substring fallback would accept fragments
+    such as "1" or "" as the first stop that contains them.
+    Time Complexity: O(L), where L is the length of the address.
+    '''
+    def resolve_address(self, address):
+        stop_id = self.exact_index.get(address)
+        if stop_id is None:
+            stop_id = self.normalized_index.get(normalize_address(address))
+        return stop_id
+
+
+'''
+Reads the lower-triangular distance table and mirrors it into a dense symmetric matrix.
+A blank cell falls back to the opposite triangle, the same rule distance_between_stops used.
+Time & Space Complexity: O(N^2), where N is the number of stops.
+'''
+def load_distance_matrix(distance_file):
+    with open(distance_file) as db:
+        rows = list(csv.reader(db, delimiter=","))
+    size = len(rows)
+    matrix = array('d', bytes(8 * size * size))
+    for y in range(size):
+        row = rows[y]
+        for x in range(y + 1):
+            distance = row[x] if x < len(row) else ''
+            if distance == '':
+                distance = rows[x][y]
+            distance = float(distance)
+            matrix[y * size + x] = distance
+            matrix[x * size + y] = distance
+    return size, matrix
+
+
+'''
+Reads stops.csv into (stop ID, name, address) rows.
+Time & Space Complexity: O(N)
+'''
+def load_stops(stops_file):
+    with open(stops_file) as stop:
+        return [(int(row[0]), row[1], row[2]) for row in csv.reader(stop, delimiter=",") if row]
+
+
+'''
+Loads the distance table and stop list into a Network.
+Time & Space Complexity: O(N^2)
+'''
+def load_network(distance_file='programdata/distance_table.csv', stops_file='programdata/stops.csv'):
+    size, matrix = load_distance_matrix(distance_file)
+    return Network(size, matrix, load_stops(stops_file))
+
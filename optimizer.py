@@ -0,0 +1,616 @@
+import heapq
+import time
+
+'''
+Route optimizers used to order a truck's deliveries.
+Every optimizer follows the same two-phase interface: construct() builds a starting tour and
+improve() refines it until no improving move is left or the time budget runs out. solve() runs
+both, collapsing packages into one node per stop in between, and returns a Route with the
+ordered packages, leg mileage and ETAs. Optimizers that set deadlines also get a TimeWindows
+in improve() so their moves keep every stop on time.
+'''
+
+
+class Route:
+    '''
+    The result of routing one truck.
+    Holds the packages in delivery order, the stop ID of each package, the distance of the leg
+    that reaches each package, the total mileage, the expected delivery time of each package
+    and the stop the route starts from.
+    '''
+    def __init__(self, packages, stops, legs, distance, etas, start=None):
+        self.packages = packages  # Packages in delivery order
+        self.stops = stops        # Stop ID for each package
+        self.legs = legs          # Distance driven to reach each package
+        self.distance = distance  # Total distance of the route
+        self.etas = etas          # Expected delivery time (seconds since midnight) for each package
+        self.start = start        # Stop ID the route starts from
+
+    def __str__(self):
+        return "%s, %s, %s" % ([package.package_id for package in self.packages],
+                               self.distance, self.etas[-1] if self.etas else '')
+
+
+class RouteOptimizer:
+    '''
+    Base optimizer: nearest-neighbor construction with no improvement phase.
+    Subclasses override improve() to spend up to time_budget seconds shortening the tour.
+    - deadlines: when True, improve() receives a TimeWindows over the tour so that it only
+      makes moves that keep every stop within its deadline.
+    '''
+    deadlines = False
+
+    def __init__(self, time_budget=0.1, neighbors=8):
+        self.time_budget = time_budget  # Seconds of CPU the improvement phase may use per truck
+        self.neighbors = neighbors      # Size of each stop's candidate neighbor list
+
+    '''
+    Greedy nearest-neighbor construction, identical to the original deliver() loop:
+    from the current stop, pick the closest undelivered package (ties go to the later package).
+    Returns the package indices in delivery order.
+    Time Complexity: O(N^2), where N is the number of packages.
+    '''
+    def construct(self, network, start, packages, stops, speed, departure_time):
+        queue = list(range(len(packages)))
+        order = []
+        current = start
+        while queue:
+            nearest_distance = float('inf')
+            for index in queue:
+                distance = network.distance(current, stops[index])
+                if distance <= nearest_distance:
+                    nearest_distance = distance
+                    nearest = index
+            order.append(nearest)
+            queue.remove(nearest)
+            current = stops[nearest]
+        return order
+
+    '''
+    Improves a tour of node indices in place. The base optimizer keeps the constructed tour.
+    - windows: a TimeWindows over the tour for optimizers with deadlines, otherwise None.
+    '''
+    def improve(self, distance, tour, neighbor_lists, deadline, windows=None):
+        return tour
+
+    '''
+    Routes the packages starting from the given stop ID.
+    Packages are constructed at package level, collapsed into one node per stop for the
+    improvement phase and expanded back in the final order.
+    Time Complexity: O(N^2) construction plus whatever the time budget allows.
+    '''
+    def solve(self, network, start, packages, speed, departure_time):
+        deadline = time.perf_counter() + self.time_budget
+        stops = [network.address_to_id(package.address) for package in packages]
+        order = self.construct(network, start, packages, stops, speed, departure_time)
+        nodes, groups, due = collapse_stops(start, packages, stops, order, departure_time)
+        distance, travel = node_metrics(network, nodes, speed)
+
+        tour = list(range(len(nodes)))
+        if len(nodes) > 3 and type(self).improve is not RouteOptimizer.improve:
+            windows = TimeWindows(travel, tour, due) if self.deadlines else None
+            tour = self.improve(distance, tour, neighbor_lists(distance, len(nodes), self.neighbors), deadline,
+                                windows)
+
+        return build_route(network, start, [packages[index] for node in tour[1:] for index in groups[node]],
+                           [stops[index] for node in tour[1:] for index in groups[node]], speed, departure_time)
+
+
+'''
+Collapses packages taken in the given order into one tour node per distinct stop; node 0 is
+the start. Returns the stop of each node, the package indices delivered at each node and each
+node's due time: the earliest deadline there in seconds after departure_time (INFINITY for EOD).
+Time & Space Complexity: O(N)
+'''
+def collapse_stops(start, packages, stops, order, departure_time):
+    nodes = [start]
+    groups = [[]]
+    due = [INFINITY]
+    node_of_stop = {}
+    for index in order:
+        stop = stops[index]
+        node = node_of_stop.get(stop)
+        if node is None:
+            node = node_of_stop[stop] = len(nodes)
+            nodes.append(stop)
+            groups.append([])
+            due.append(INFINITY)
+        groups[node].append(index)
+        package_deadline = packages[index].deadline
+        if package_deadline is not None:
+            due[node] = min(due[node], package_deadline - departure_time)
+    return nodes, groups, due
+
+
+'''
+Returns the distance(a, b) in miles and travel(a, b) in driving seconds between tour nodes.
+'''
+def node_metrics(network, nodes, speed):
+    def distance(a, b):
+        return network.distance(nodes[a], nodes[b])
+
+    def travel(a, b):
+        return network.distance(nodes[a], nodes[b]) / speed * 3600
+
+    return distance, travel
+
+
+'''
+Builds the candidate neighbor list of every node: its k closest other nodes.
+Time Complexity: O(N^2 log k)
+'''
+def neighbor_lists(distance, size, k):
+    lists = []
+    for a in range(size):
+        lists.append(heapq.nsmallest(k, (b for b in range(size) if b != a), key=lambda b: distance(a, b)))
+    return lists
+
+
+'''
+Builds a Route from packages already in delivery order.
+ETAs are accumulated exactly the way update_info advances the truck clock.
+Time & Space Complexity: O(N)
+'''
+def build_route(network, start, packages, stops, speed, departure_time):
+    legs = []
+    etas = []
+    current = start
+    total = 0
+    clock = float(departure_time)
+    for stop in stops:
+        leg = network.distance(current, stop)
+        legs.append(leg)
+        total += leg
+        clock += leg / speed * 3600
+        etas.append(round(clock))
+        current = stop
+    return Route(packages, stops, legs, total, etas, start)
+
+
+class NearestNeighbor(RouteOptimizer):
+    '''
+    The baseline: the greedy nearest-neighbor tour with no improvement.
+    '''
+
+
+class TwoOpt(RouteOptimizer):
+    '''
+    Nearest-neighbor construction followed by 2-opt on the open tour (the start stays fixed and
+    the truck does not return). Candidate moves come from each node's neighbor list and a
+    don't-look bit skips nodes whose surroundings have not changed since they last failed.
+    '''
+    def improve(self, distance, tour, neighbor_lists, deadline, windows=None):
+        return two_opt(distance, tour, neighbor_lists, deadline, windows)
+
+
+class OrOpt(RouteOptimizer):
+    '''
+    Nearest-neighbor construction followed by Or-opt: segments of one to three stops are
+    moved, optionally reversed, next to one of their neighbors.
+    '''
+    def improve(self, distance, tour, neighbor_lists, deadline, windows=None):
+        return or_opt(distance, tour, neighbor_lists, deadline, windows)
+
+
+class LocalSearch(RouteOptimizer):
+    '''
+    Nearest-neighbor construction followed by alternating 2-opt and Or-opt passes until
+    neither finds an improvement or the time budget runs out.
+    '''
+    def improve(self, distance, tour, neighbor_lists, deadline, windows=None):
+        while time.perf_counter() < deadline:
+            before = tour_length(distance, tour)
+            tour = two_opt(distance, tour, neighbor_lists, deadline, windows)
+            tour = or_opt(distance, tour, neighbor_lists, deadline, windows)
+            if tour_length(distance, tour) >= before - 1e-9:
+                break
+        return tour
+
+
+class DeadlineAware(LocalSearch):
+    '''
+    Deadline-aware routing. Each stop is due by the earliest deadline of the packages delivered
+    there, treated as a hard time window:
+    - construct() drives to the nearest stop from which every remaining deadline can still be
+      reached directly, falling back to the most urgent stop when none can;
+    - improve() first moves late stops earlier where that does not make any other stop late,
+      then runs the 2-opt / Or-opt passes using only moves that keep every stop on time.
+    Stops that cannot be reached in time are never made later than construction left them;
+    late_packages() reports them.
+    '''
+    deadlines = True
+
+    '''
+    Builds the node tour both mixed and with every deadline stop first, keeps whichever leaves
+    fewer stops late (then less total lateness, then fewer miles) and returns its package order.
+    Time Complexity: O(S^2 * D), where S is the number of stops and D the number with a deadline.
+    '''
+    def construct(self, network, start, packages, stops, speed, departure_time):
+        nodes, groups, due = collapse_stops(start, packages, stops, range(len(packages)), departure_time)
+        distance, travel = node_metrics(network, nodes, speed)
+        best = None
+        for urgent_first in (False, True):
+            candidate = deadline_construct(travel, due, urgent_first)
+            windows = TimeWindows(travel, candidate, due)
+            late = windows.relax()
+            score = (len(late), sum(windows.due[node] - due[node] for node in late), tour_length(distance, candidate))
+            if best is None or score < best[0]:
+                best = (score, candidate)
+        return [index for node in best[1][1:] for index in groups[node]]
+
+    '''
+    Relaxes the deadlines construction could not meet, repairs the late stops where possible
+    and then shortens the tour with deadline-preserving 2-opt and Or-opt moves.
+    '''
+    def improve(self, distance, tour, neighbor_lists, deadline, windows=None):
+        repair_late(distance, tour, windows, windows.relax())
+        return super().improve(distance, tour, neighbor_lists, deadline, windows)
+
+
+'''
+Returns the length of an open tour.
+Time Complexity: O(N)
+'''
+def tour_length(distance, tour):
+    return sum(distance(tour[i], tour[i + 1]) for i in range(len(tour) - 1))
+
+
+'''
+2-opt with neighbor lists and don't-look bits on an open tour whose first node is fixed.
+Reversing positions p+1..q replaces edges (p, p+1) and (q, q+1) with (p, q) and (p+1, q+1);
+the second edge disappears when q is the last position.
+With windows (a TimeWindows over the same tour) a move is only made if every stop still meets
+its deadline.
+Time Complexity: O(N * k) per pass over the active nodes, O(N) per applied move
+(O(N log N) with windows).
+'''
+def two_opt(distance, tour, neighbor_lists, deadline, windows=None):
+    last = len(tour) - 1
+    position = [0] * len(tour)
+    for i, node in enumerate(tour):
+        position[node] = i
+
+    def edge(i):
+        return distance(tour[i], tour[i + 1]) if i < last else 0
+
+    active = list(reversed(tour))
+    queued = [True] * len(tour)
+    while active and time.perf_counter() < deadline:
+        a = active.pop()
+        queued[a] = False
+        improved = False
+        for c in neighbor_lists[a]:
+            i, j = position[a], position[c]
+            # Join a and c either as (a, c) after reversing the stretch between them, or as
+            # (pred(a), pred(c)) when c comes before a.
+            for p, q in ((min(i, j), max(i, j)), (min(i, j) - 1, max(i, j) - 1)):
+                if p < 0 or q - p < 2:
+                    continue
+                delta = distance(tour[p], tour[q]) - edge(p) - edge(q)
+                if q < last:
+                    delta += distance(tour[p + 1], tour[q + 1])
+                if delta < -1e-9 and (windows is None or windows.reversal_fits(p, q)):
+                    tour[p + 1:q + 1] = tour[p + 1:q + 1][::-1]
+                    for k in range(p + 1, q + 1):
+                        position[tour[k]] = k
+                    if windows is not None:
+                        windows.rebuild()
+                    for k in (p, p + 1, q, q + 1):
+                        if k <= last and k > 0 and not queued[tour[k]]:
+                            queued[tour[k]] = True
+                            active.append(tour[k])
+                    improved = True
+                    break
+            if improved:
+                break
+        if improved and not queued[a]:
+            queued[a] = True
+            active.append(a)
+    return tour
+
+
+'''
+Or-opt with neighbor lists and don't-look bits on an open tour whose first node is fixed.
+Moves a segment of one to three nodes starting at an active node so that it sits directly after
+or before one of that node's neighbors, in either orientation, when that shortens the tour
+(and, with windows, keeps every stop within its deadline).
+Time Complexity: O(N * k) per pass over the active nodes, O(N) per applied move
+(O(N log N) with windows).
+'''
+def or_opt(distance, tour, neighbor_lists, deadline, windows=None):
+    position = [0] * len(tour)
+    for i, node in enumerate(tour):
+        position[node] = i
+    active = list(reversed(tour[1:]))
+    queued = [False] + [True] * (len(tour) - 1)
+    while active and time.perf_counter() < deadline:
+        a = active.pop()
+        queued[a] = False
+        move = best_segment_move(distance, tour, position, a, neighbor_lists[a], windows)
+        if move is None:
+            continue
+        start, length, insert_after, reverse = move
+        segment = tour[start:start + length]
+        touched = [tour[start - 1], insert_after] + segment
+        if start + length < len(tour):
+            touched.append(tour[start + length])
+        del tour[start:start + length]
+        at = tour.index(insert_after) + 1
+        tour[at:at] = segment[::-1] if reverse else segment
+        for i in range(min(start, at), len(tour)):
+            position[tour[i]] = i
+        if windows is not None:
+            windows.rebuild()
+        if at < len(tour) - len(segment):
+            touched.append(tour[at + len(segment)])
+        for node in touched:
+            if node != tour[0] and not queued[node]:
+                queued[node] = True
+                active.append(node)
+    return tour
+
+
+'''
+Finds the first improving Or-opt move for segments starting at node a.
+Returns (start position, segment length, node to insert after, reversed) or None.
+Time Complexity: O(k) candidate evaluations, each O(1).
+'''
+def best_segment_move(distance, tour, position, a, neighbors, windows=None):
+    last = len(tour) - 1
+    start = position[a]
+    for length in (1, 2, 3):
+        end = start + length - 1
+        if end > last:
+            break
+        prev_node = tour[start - 1]
+        first, tail = tour[start], tour[end]
+        next_node = tour[end + 1] if end < last else None
+        removal_gain = distance(prev_node, first)
+        if next_node is not None:
+            removal_gain += distance(tail, next_node) - distance(prev_node, next_node)
+        segment = tour[start:end + 1]
+        for c in neighbors:
+            if c in segment:
+                continue
+            c_position = position[c]
+            # Insert right after c or right before c (i.e. after its predecessor).
+            for after_position in (c_position, c_position - 1):
+                if after_position < 0 or start - 1 <= after_position <= end:
+                    continue
+                after = tour[after_position]
+                before = tour[after_position + 1] if after_position < last else None
+                if before in segment:
+                    continue
+                base = -distance(after, before) if before is not None else 0
+                for reverse in (False, True):
+                    head, end_node = (tail, first) if reverse else (first, tail)
+                    cost = base + distance(after, head)
+                    if before is not None:
+                        cost += distance(end_node, before)
+                    if cost < removal_gain - 1e-9 and (windows is None or
+                                                       windows.move_fits(start, end, after_position, reverse)):
+                        return start, length, after, reverse
+    return None
+
+
+# Arrival times within this many seconds of a deadline count as on time (float rounding).
+EPSILON = 1e-6
+INFINITY = float('inf')
+
+
+class TimeWindows:
+    '''
+    Deadline feasibility checks for a tour in O(1) per candidate move.
+    - travel(a, b): driving seconds between two nodes; distances must be symmetric, as the
+      network's are, so a reversed stretch takes as long as the forward one.
+    - due: the latest arrival at each node in seconds after the start (INFINITY for EOD).
+    For the current tour it keeps each position's arrival offset and range-minimum tables over
+    the forward time slack (due - arrival) and over due + arrival. The latest time any forward or
+    reversed stretch of the tour may start is then one range query, and a 2-opt or Or-opt move,
+    which only reorders up to four stretches, is checked by chaining them.
+    '''
+    def __init__(self, travel, tour, due):
+        self.travel = travel
+        self.tour = tour  # The tour list the improvement functions edit in place
+        self.deadlines = list(due)
+        self.due = list(due)
+        self.rebuild()
+
+    '''
+    Recomputes the arrival offsets and slack tables after the tour changed.
+    Time & Space Complexity: O(N log N)
+    '''
+    def rebuild(self):
+        tour = self.tour
+        arrival = [0.0]
+        for i in range(1, len(tour)):
+            arrival.append(arrival[-1] + self.travel(tour[i - 1], tour[i]))
+        self.arrival = arrival
+        self.forward = range_min_table([self.due[node] - arrival[i] for i, node in enumerate(tour)])
+        self.backward = range_min_table([self.due[node] + arrival[i] for i, node in enumerate(tour)])
+
+    '''
+    Loosens the deadline of every late node to its current arrival, so that no later move can
+    make a late stop later or another stop late. Returns the late nodes, latest first.
+    '''
+    def relax(self):
+        late = []
+        for i, node in enumerate(self.tour):
+            if self.arrival[i] > self.due[node] + EPSILON:
+                late.append((self.arrival[i] - self.due[node], node))
+                self.due[node] = self.arrival[i]
+        self.rebuild()
+        return [node for lateness, node in sorted(late, reverse=True)]
+
+    '''
+    Returns (first node, last node, duration, latest start) of tour positions i..j, optionally
+    driven in reverse.
+    Time Complexity: O(1)
+    '''
+    def stretch(self, i, j, reverse=False):
+        duration = self.arrival[j] - self.arrival[i]
+        if reverse:
+            return self.tour[j], self.tour[i], duration, range_min(self.backward, i, j) - self.arrival[j]
+        return self.tour[i], self.tour[j], duration, range_min(self.forward, i, j) + self.arrival[i]
+
+    '''
+    Returns True if driving the stretches in order from the start keeps every node on time.
+    Time Complexity: O(S), where S is the number of stretches.
+    '''
+    def fits(self, stretches):
+        clock = 0.0
+        previous = None
+        for first, last, duration, latest in stretches:
+            if previous is not None:
+                clock += self.travel(previous, first)
+            if clock > latest + EPSILON:
+                return False
+            clock += duration
+            previous = last
+        return True
+
+    '''
+    Checks the 2-opt move that reverses positions p+1..q.
+    Time Complexity: O(1)
+    '''
+    def reversal_fits(self, p, q):
+        last = len(self.tour) - 1
+        stretches = [self.stretch(0, p), self.stretch(p + 1, q, True)]
+        if q < last:
+            stretches.append(self.stretch(q + 1, last))
+        return self.fits(stretches)
+
+    '''
+    Checks the Or-opt move that puts positions start..end (optionally reversed) after position after.
+    Time Complexity: O(1)
+    '''
+    def move_fits(self, start, end, after, reverse):
+        last = len(self.tour) - 1
+        segment = self.stretch(start, end, reverse)
+        if after < start:
+            stretches = [self.stretch(0, after), segment, self.stretch(after + 1, start - 1)]
+            rest = end + 1
+        else:
+            stretches = [self.stretch(0, start - 1), self.stretch(end + 1, after), segment]
+            rest = after + 1
+        if rest <= last:
+            stretches.append(self.stretch(rest, last))
+        return self.fits(stretches)
+
+
+'''
+Builds a sparse table for constant-time range minimums of values.
+Time & Space Complexity: O(N log N)
+'''
+def range_min_table(values):
+    table = [values]
+    width = 1
+    while 2 * width <= len(values):
+        previous = table[-1]
+        table.append([min(previous[i], previous[i + width]) for i in range(len(previous) - width)])
+        width *= 2
+    return table
+
+
+'''
+Returns the minimum of positions i..j from a range_min_table.
+Time Complexity: O(1)
+'''
+def range_min(table, i, j):
+    level = (j - i + 1).bit_length() - 1
+    return min(table[level][i], table[level][j - (1 << level) + 1])
+
+
+'''
+Deadline-aware nearest-neighbor construction over nodes (node 0 is the start).
+From the current node it picks the nearest node after which every deadline that is still
+reachable stays reachable by driving straight there; if no node qualifies it picks the node
+with the earliest due time. With urgent_first, nodes without a deadline are only visited once
+every deadline node has been.
+Time Complexity: O(N^2 * D), where D is the number of nodes with a deadline.
+'''
+def deadline_construct(travel, due, urgent_first=False):
+    remaining = list(range(1, len(due)))
+    tour = [0]
+    current = 0
+    clock = 0.0
+    while remaining:
+        reachable = [node for node in remaining
+                     if due[node] != INFINITY and clock + travel(current, node) <= due[node] + EPSILON]
+        candidates = remaining
+        if urgent_first and any(due[node] != INFINITY for node in remaining):
+            candidates = [node for node in remaining if due[node] != INFINITY]
+        best = None
+        best_time = INFINITY
+        for node in candidates:
+            leg = travel(current, node)
+            if leg >= best_time:
+                continue
+            arrival = clock + leg
+            if all(arrival + travel(node, other) <= due[other] + EPSILON
+                   for other in reachable if other != node):
+                best = node
+                best_time = leg
+        if best is None:
+            best = min(candidates, key=lambda node: (due[node], travel(current, node)))
+        clock += travel(current, best)
+        tour.append(best)
+        remaining.remove(best)
+        current = best
+    return tour
+
+
+'''
+Moves each late node (in the given order) to the position before it that adds the least
+distance while the node makes its real deadline and no other node misses its (relaxed) one.
+Nodes that fit nowhere keep their position.
+Time Complexity: O(N) checks per late node plus O(N log N) per applied move.
+'''
+def repair_late(distance, tour, windows, late):
+    for node in late:
+        windows.due[node] = windows.deadlines[node]
+        windows.rebuild()
+        start = tour.index(node)
+        best = None
+        best_cost = INFINITY
+        for after in range(start - 1):
+            cost = distance(tour[after], node) + distance(node, tour[after + 1]) - distance(tour[after], tour[after + 1])
+            if cost < best_cost and windows.move_fits(start, start, after, False):
+                best = after
+                best_cost = cost
+        if best is None:
+            windows.due[node] = windows.arrival[start]
+        else:
+            del tour[start]
+            tour.insert(best + 1, node)
+        windows.rebuild()
+    return tour
+
+
+'''
+Returns (package, ETA, deadline) for every package on the route that is delivered after its
+deadline.
+Time Complexity: O(N)
+'''
+def late_packages(route):
+    return [(package, eta, package.deadline) for package, eta in zip(route.packages, route.etas)
+            if package.deadline is not None and eta > package.deadline]
+
+
+# Registry of optimizers selectable by name.
+OPTIMIZERS = {
+    'nearest': NearestNeighbor,
+    '2opt': TwoOpt,
+    'oropt': OrOpt,
+    'local': LocalSearch,
+    'deadline': DeadlineAware,
+}
+
+'''
+Creates a route optimizer by name.
+Raises a ValueError for unknown names.
+'''
+def get_optimizer(name, **options):
+    if name not in OPTIMIZERS:
+        raise ValueError('Unknown route optimizer: %s' % name)
+    return OPTIMIZERS[name](**options)
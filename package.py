@@ -1,25 +1,119 @@
+import sys
+from array import array
+
+
+class PackageStatus:
+    '''
+    The interned status values a package moves through.
+    Every Package shares these three string objects instead of holding its own copy.
+    '''
+    AT_HUB = sys.intern('Package is at the Hub')
+    EN_ROUTE = sys.intern('Package is En Route')
+    DELIVERED = sys.intern('Package Delivered')
+
+    # Compact codes used by PackageBatch's status column.
+    CODES = (AT_HUB, EN_ROUTE, DELIVERED)
+
+
 '''
 Represents a package with detailed delivery information.
 Each package has a unique ID, address information, delivery deadline, weight, notes,
 and status information (including delivery time, time loaded, and associated truck number).
+Fields are typed and stored in slots: times are seconds since midnight (None when unset),
+the deadline is seconds since midnight (None for EOD) and the weight is a float.
 '''
 class Package:
+    __slots__ = ('package_id', 'address', 'city', 'zipcode', 'state', 'deadline', 'weight', 'notes',
+                 'status', 'time_delivered', 'start_time', 'truck_number')
+
     def __init__(self, package_id, address, city, zipcode, state, deadline, weight, notes, status, time_delivered, start_time, truck_number=None):
         self.package_id = package_id      # Unique package identifier
         self.address = address            # Delivery address
         self.city = city                  # Delivery city
         self.zipcode = zipcode            # Delivery zip code
         self.state = state                # Delivery state
-        self.deadline = deadline          # Delivery deadline
+        self.deadline = deadline          # Delivery deadline in seconds since midnight (None for EOD)
         self.weight = weight              # Package weight
         self.notes = notes                # Special instructions or notes
-        self.status = status              # Current status (e.g., 'Hub', 'En Route', 'Delivered')
-        self.time_delivered = time_delivered  # Time when the package was delivered
-        self.start_time = start_time      # Time when the package left the hub
+        self.status = status              # Current status (one of the PackageStatus values)
+        self.time_delivered = time_delivered  # Seconds since midnight when the package was delivered
+        self.start_time = start_time      # Seconds since midnight when the package left the hub
         self.truck_number = truck_number  # Assigned truck number (if any)
 
+    '''
+    Returns an independent copy of the package.
+    '''
+    def copy(self):
+        return Package(self.package_id, self.address, self.city, self.zipcode, self.state, self.deadline,
+                       self.weight, self.notes, self.status, self.time_delivered, self.start_time,
+                       self.truck_number)
+
     def __str__(self):
         return "%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s" % (
             self.package_id, self.address, self.city, self.zipcode, self.state,
             self.deadline, self.weight, self.notes, self.status, self.time_delivered,
             self.start_time, self.truck_number)
+
+
+# Stored in integer columns in place of None (no deadline, not delivered, not loaded, no truck).
+MISSING = -1
+
+
+class PackageBatch:
+    '''
+    A columnar package store for very large manifests.
+    Numeric fields live in typed arrays (8 bytes per value or less) and text fields in lists of
+    interned strings, so a million packages cost a fraction of the memory of a million Package
+    objects. Packages are appended by ingest.load_batch, and rows can be materialized as Package
+    objects on demand. The batch is a storage format only: routing and reporting work on Package
+    objects.
+    '''
+    def __init__(self):
+        self.package_id = array('q')
+        self.deadline = array('q')
+        self.weight = array('d')
+        self.time_delivered = array('q')
+        self.start_time = array('q')
+        self.truck_number = array('l')
+        self.status = array('b')
+        self.address = []
+        self.city = []
+        self.zipcode = []
+        self.state = []
+        self.notes = []
+
+    def __len__(self):
+        return len(self.package_id)
+
+    '''
+    Appends a Package object.
+    Time & Space Complexity: O(1) amortized.
+    '''
+    def append(self, package):
+        self.package_id.append(package.package_id)
+        self.deadline.append(MISSING if package.deadline is None else package.deadline)
+        self.weight.append(package.weight)
+        self.time_delivered.append(MISSING if package.time_delivered is None else package.time_delivered)
+        self.start_time.append(MISSING if package.start_time is None else package.start_time)
+        self.truck_number.append(MISSING if package.truck_number is None else package.truck_number)
+        self.status.append(PackageStatus.CODES.index(package.status))
+        self.address.append(sys.intern(package.address))
+        self.city.append(sys.intern(package.city))
+        self.zipcode.append(sys.intern(package.zipcode))
+        self.state.append(sys.intern(package.state))
+        self.notes.append(sys.intern(package.notes))
+
+    '''
+    Materializes one row as a Package object.
+    '''
+    def package(self, row):
+        def optional(value):
+            return None if value == MISSING else value
+        return Package(self.package_id[row], self.address[row], self.city[row], self.zipcode[row],
+                       self.state[row], optional(self.deadline[row]), self.weight[row], self.notes[row],
+                       PackageStatus.CODES[self.status[row]], optional(self.time_delivered[row]),
+                       optional(self.start_time[row]), optional(self.truck_number[row]))
+
+    def __iter__(self):
+        for row in range(len(self.package_id)):
+            yield self.package(row)
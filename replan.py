@@ -0,0 +1,106 @@
+from dispatch import apply_route
+from optimizer import LocalSearch, Route
+
+'''
+Event-driven re-planning of routes that are already being driven.
+When a package's address changes mid-day only its own truck is touched: the part of the route
+driven before the change (including the leg the truck is on) is frozen, and only the remaining
+stops are re-optimized from where the truck will be, so downstream ETAs update without
+re-solving the fleet.
+'''
+
+
+class Replanner:
+    '''
+    Holds the live plan: the trucks, their routes (as returned by dispatch) and the network.
+    Every address change is also recorded in address_events, in the
+    (package ID, effective seconds, (address, city, zipcode, state)) form Timeline reads.
+    '''
+    def __init__(self, trucks, routes, network, optimizer=None):
+        self.trucks = trucks
+        self.routes = list(routes)
+        self.network = network
+        self.optimizer = optimizer if optimizer is not None else LocalSearch()
+        self.address_events = []
+        # Package ID -> index of the truck carrying it.
+        self.truck_of = {}
+        for index, route in enumerate(self.routes):
+            for package in route.packages:
+                self.truck_of[package.package_id] = index
+
+    '''
+    Changes a package's delivery address from effective_time (seconds since midnight) onwards
+    and re-plans the rest of its truck's route.
+    - Deliveries made before effective_time, and the leg the truck is driving at that moment,
+      are kept as they are. A truck that has not left yet is re-planned from the hub.
+    - The remaining stops, including the corrected package, are re-optimized from the end of
+      that leg, and the truck totals and package delivery times are updated.
+    Raises a ValueError for unknown packages, packages already delivered, or addresses that do
+    not match a stop exactly or after normalization.
+    Returns the new Route of the affected truck.
+    Time Complexity: the optimizer's cost on the remaining stops only.
+    '''
+    def apply_address_change(self, package_id, new_address, effective_time, city=None, zipcode=None, state=None):
+        index = self.truck_of.get(package_id)
+        if index is None:
+            raise ValueError('Package %s is not on any truck' % package_id)
+        if self.network.resolve_address(new_address) is None:
+            raise ValueError('Unknown address: %s' % new_address)
+        truck = self.trucks[index]
+        route = self.routes[index]
+        position = next(i for i, package in enumerate(route.packages) if package.package_id == package_id)
+        if route.etas[position] <= effective_time:
+            raise ValueError('Package %s was delivered before the address change' % package_id)
+
+        # Freeze everything delivered by effective_time, then the leg in progress.
+        frozen = 0
+        while route.etas[frozen] <= effective_time:
+            frozen += 1
+        kept = route.packages[:frozen]
+        kept_legs = route.legs[:frozen]
+        kept_stops = route.stops[:frozen]
+        carried = 0  # Distance already driven towards a stop where nothing is delivered any more
+        if effective_time < truck.departure_time:
+            start = route.start
+            start_time = truck.departure_time
+        else:
+            # The truck finishes the leg it is on and delivers the packages at that stop,
+            # except the corrected one.
+            start = route.stops[frozen]
+            start_time = route.etas[frozen]
+            while frozen < len(route.packages) and route.stops[frozen] == start:
+                if frozen == position:
+                    carried += route.legs[frozen]
+                else:
+                    kept.append(route.packages[frozen])
+                    kept_legs.append(route.legs[frozen] + carried)
+                    kept_stops.append(start)
+                    carried = 0
+                frozen += 1
+
+        package = route.packages[position]
+        previous = (package.address, package.city, package.zipcode, package.state)
+        package.address = new_address
+        package.city = city if city is not None else package.city
+        package.zipcode = zipcode if zipcode is not None else package.zipcode
+        package.state = state if state is not None else package.state
+        if not any(event[0] == package_id for event in self.address_events):
+            self.address_events.append((package_id, 0, previous))
+        self.address_events.append((package_id, effective_time,
+                                    (package.address, package.city, package.zipcode, package.state)))
+
+        # Re-optimize only the suffix, then replay the whole route so the truck totals and the
+        # delivery times come out of update_info exactly as they do for a fresh dispatch.
+        remaining = [p for p in route.packages[frozen:] if p is not package] + [package]
+        suffix = self.optimizer.solve(self.network, start, remaining, truck.speed, start_time)
+        suffix.legs[0] += carried
+        packages = kept + suffix.packages
+        legs = kept_legs + suffix.legs
+        truck.distance = 0
+        truck.delivery_time = float(truck.departure_time)
+        apply_route(truck, packages, legs)
+
+        new_route = Route(packages, kept_stops + suffix.stops, legs, sum(legs),
+                          [p.time_delivered for p in packages], route.start)
+        self.routes[index] = new_route
+        return new_route
@@ -0,0 +1,341 @@
+import asyncio
+import json
+from urllib.parse import urlsplit, parse_qs
+
+from clock import seconds, parse_time, format_seconds
+from engine import snapshot_record
+from timeline import Timeline
+
+'''
+Local HTTP status service.
+Answers "where is package X at time T" for many clients at once on an asyncio event loop.
+Every request reads one immutable StatusSnapshot (the delivery timeline plus the fleet summary).
+After a re-plan a new snapshot is built off to the side and swapped in with a single attribute
+assignment, so readers never take a lock and never see a half-updated plan.
+
+Endpoints (times are HH:MM:SS and default to the end of the day):
+    GET  /packages/<id>?at=10:30:00         one package
+    GET  /packages?ids=1,2,3&at=10:30:00    several packages (all packages without ids)
+    POST /packages  {"ids": [1, 2], "at": "10:30:00"}
+    GET  /fleet?at=10:30:00                 truck distances, run times and package counts
+    POST /corrections  {"package_id": 9, "address": "...", "at": "10:20:00",
+                        "city": "...", "zipcode": "...", "state": "..."}
+'''
+
+END_OF_DAY = seconds(23, 59, 59)
+
+# Largest request body accepted, in bytes.
+MAX_BODY = 1 << 20
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           413: 'Payload Too Large', 431: 'Request Header Fields Too Large', 500: 'Internal Server Error'}
+
+
+class HTTPError(Exception):
+    '''
+    Raised by a handler to answer with an error status and message.
+    '''
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class StatusSnapshot:
+    '''
+    An immutable view of one version of the plan: the query timeline and the fleet summary.
+    Nothing in it refers to the live Package or Truck objects, so re-planning cannot change it.
+    '''
+    __slots__ = ('version', 'timeline', 'summary')
+
+    def __init__(self, version, timeline, summary):
+        self.version = version
+        self.timeline = timeline
+        self.summary = summary
+
+    '''
+    Builds the snapshot of a Plan's current state.
+    Time Complexity: O(N log N), where N is the number of packages.
+    '''
+    @classmethod
+    def from_plan(cls, plan, version):
+        return cls(version, Timeline(plan.packages, plan.replanner.address_events), plan.summary())
+
+
+class StatusService:
+    '''
+    Serves status queries for a Plan.
+    Readers use whatever snapshot is current when their request starts; apply_address_change
+    re-plans in a worker thread (one writer at a time) and then publishes a new snapshot.
+    '''
+    def __init__(self, plan):
+        self.plan = plan
+        self.snapshot = StatusSnapshot.from_plan(plan, 1)
+        self._writer = None  # Created on first use, inside the running event loop
+
+    '''
+    Builds a snapshot of the plan and makes it the current one.
+    The swap is a single reference assignment, so a reader sees either the old or the new plan.
+    '''
+    def publish(self):
+        self.snapshot = StatusSnapshot.from_plan(self.plan, self.snapshot.version + 1)
+        return self.snapshot
+
+    '''
+    Re-plans a package's truck for an address change and publishes the result.
+    Returns the published snapshot.
+    '''
+    async def apply_address_change(self, package_id, new_address, effective_time, city=None, zipcode=None,
+                                   state=None):
+        if self._writer is None:
+            self._writer = asyncio.Lock()
+        async with self._writer:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, self._replan, package_id, new_address, effective_time, city,
+                                       zipcode, state)
+            return self.snapshot
+
+    '''
+    Runs in a worker thread: re-plans the affected truck, then swaps in the new snapshot.
+    '''
+    def _replan(self, package_id, new_address, effective_time, city, zipcode, state):
+        self.plan.apply_address_change(package_id, new_address, effective_time, city, zipcode, state)
+        self.publish()
+
+    '''
+    Routes one request to its handler and returns (status, document).
+    '''
+    async def handle(self, method, target, body):
+        url = urlsplit(target)
+        query = parse_qs(url.query)
+        parts = [part for part in url.path.split('/') if part]
+        snapshot = self.snapshot  # Read once; the whole request is answered from this version.
+        if parts == ['fleet']:
+            require_method(method, 'GET')
+            return 200, fleet_document(snapshot, query_time(query))
+        if parts == ['packages']:
+            if method == 'POST':
+                document = json_body(body)
+                ids = document.get('ids')
+                if not isinstance(ids, list):
+                    raise HTTPError(400, 'ids must be a list of package IDs')
+                return 200, packages_document(snapshot, [package_id(value) for value in ids],
+                                              clock_value(document.get('at')))
+            require_method(method, 'GET', 'POST')
+            ids = None
+            if 'ids' in query:
+                ids = [package_id(value) for text in query['ids'] for value in text.split(',') if value]
+            return 200, packages_document(snapshot, ids, query_time(query))
+        if len(parts) == 2 and parts[0] == 'packages':
+            require_method(method, 'GET')
+            at = query_time(query)
+            found = snapshot.timeline.snapshot(package_id(parts[1]), at)
+            if found is None:
+                raise HTTPError(404, 'Unknown package: %s' % parts[1])
+            return 200, {'version': snapshot.version, 'at': format_seconds(at), 'package': snapshot_record(found)}
+        if parts == ['corrections']:
+            require_method(method, 'POST')
+            document = json_body(body)
+            address = document.get('address')
+            if not isinstance(address, str):
+                raise HTTPError(400, 'address must be a string')
+            for field in ('city', 'zipcode', 'state'):
+                if document.get(field) is not None and not isinstance(document[field], str):
+                    raise HTTPError(400, '%s must be a string' % field)
+            try:
+                published = await self.apply_address_change(
+                    package_id(document.get('package_id')), address, clock_value(document.get('at')),
+                    document.get('city'), document.get('zipcode'), document.get('state'))
+            except ValueError as error:
+                raise HTTPError(400, str(error))
+            return 200, {'version': published.version}
+        raise HTTPError(404, 'No such endpoint: %s' % url.path)
+
+    '''
+    Serves one client connection, answering requests until the client closes it or asks to.
+    '''
+    async def serve_client(self, reader, writer):
+        try:
+            while True:
+                request = await read_request(reader)
+                if request is None:
+                    break
+                method, target, version, headers, body = request
+                try:
+                    status, document = await self.handle(method, target, body)
+                except HTTPError as error:
+                    status, document = error.status, {'error': error.message}
+                except Exception as error:
+                    status, document = 500, {'error': str(error)}
+                connection = headers.get('connection', '').lower()
+                keep_alive = connection == 'keep-alive' or (version == 'HTTP/1.1' and connection != 'close')
+                writer.write(encode_response(status, document, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except HTTPError as error:
+            writer.write(encode_response(error.status, {'error': error.message}, False))
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    '''
+    Starts listening and returns the asyncio server. Port 0 picks a free port; the bound
+    address is in server.sockets[0].getsockname().
+    '''
+    async def start(self, host='127.0.0.1', port=8080):
+        return await asyncio.start_server(self.serve_client, host, port)
+
+
+'''
+Reads one HTTP request. Returns (method, target, version, headers, body), or None at end of stream.
+'''
+async def read_request(reader):
+    try:
+        line = await reader.readline()
+    except ValueError:  # Longer than the stream's line limit
+        raise HTTPError(400, 'Request line is too long')
+    if not line:
+        return None
+    try:
+        method, target, version = line.decode('latin-1').split()
+    except ValueError:
+        raise HTTPError(400, 'Malformed request line')
+    headers = {}
+    while True:
+        try:
+            line = await reader.readline()
+        except ValueError:
+            raise HTTPError(431, 'Request header is too long')
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    try:
+        length = int(headers.get('content-length', 0))
+    except ValueError:
+        raise HTTPError(400, 'Invalid Content-Length')
+    if length < 0:
+        raise HTTPError(400, 'Invalid Content-Length')
+    if length > MAX_BODY:
+        raise HTTPError(413, 'Request body is too large')
+    body = await reader.readexactly(length) if length else b''
+    return method.upper(), target, version, headers, body
+
+
+'''
+Encodes a JSON response with its status line and headers.
+'''
+def encode_response(status, document, keep_alive):
+    payload = json.dumps(document).encode('utf-8')
+    head = ('HTTP/1.1 %d %s\r\nContent-Type: application/json\r\nContent-Length: %d\r\nConnection: %s\r\n\r\n'
+            % (status, REASONS.get(status, ''), len(payload), 'keep-alive' if keep_alive else 'close'))
+    return head.encode('latin-1') + payload
+
+
+'''
+Raises a 405 error unless the method is one of the allowed ones.
+'''
+def require_method(method, *allowed):
+    if method not in allowed:
+        raise HTTPError(405, 'Use %s' % ' or '.join(allowed))
+
+
+'''
+Decodes a JSON object request body.
+'''
+def json_body(body):
+    try:
+        document = json.loads(body or b'{}')
+    except ValueError:
+        raise HTTPError(400, 'Body must be JSON')
+    if not isinstance(document, dict):
+        raise HTTPError(400, 'Body must be a JSON object')
+    return document
+
+
+'''
+Converts a path segment or JSON value to a package ID.
+'''
+def package_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise HTTPError(400, 'Invalid package ID: %s' % value)
+
+
+'''
+Parses an HH:MM:SS time (None means the end of the day) into seconds since midnight.
+'''
+def clock_value(value):
+    if value is None:
+        return END_OF_DAY
+    try:
+        return parse_time(value)
+    except (TypeError, ValueError):
+        raise HTTPError(400, 'Times must be in HH:MM:SS format')
+
+
+'''
+Returns the ?at= time of a parsed query string in seconds since midnight.
+'''
+def query_time(query):
+    return clock_value(query['at'][-1] if 'at' in query else None)
+
+
+'''
+Returns the records of the given package IDs (every package if ids is None); unknown IDs are
+listed separately.
+Time Complexity: O(K), where K is the number of IDs requested.
+'''
+def packages_document(snapshot, ids, at):
+    timeline = snapshot.timeline
+    if ids is None:
+        found = timeline.snapshot_all(at)
+        missing = []
+    else:
+        found = []
+        missing = []
+        for pid in ids:
+            package = timeline.snapshot(pid, at)
+            if package is None:
+                missing.append(pid)
+            else:
+                found.append(package)
+    return {'version': snapshot.version, 'at': format_seconds(at),
+            'packages': [snapshot_record(package) for package in found], 'unknown': missing}
+
+
+'''
+Returns the fleet summary (the menu's trip information) and the package counts at a time.
+Time Complexity: O(T + log N), where T is the number of trucks.
+'''
+def fleet_document(snapshot, at):
+    summary = snapshot.summary
+    at_hub, en_route, delivered = snapshot.timeline.counts(at)
+    return {
+        'version': snapshot.version,
+        'at': format_seconds(at),
+        'trucks': [{'truck': truck['truck'], 'departure': format_seconds(truck['departure']),
+                    'distance': truck['distance'], 'run_time': format_seconds(truck['run_time']),
+                    'packages': truck['packages'], 'late': truck['late']} for truck in summary['trucks']],
+        'total_distance': summary['total_distance'],
+        'total_run_time': format_seconds(summary['total_run_time']),
+        'missed_deadlines': summary['missed_deadlines'],
+        'at_hub': at_hub,
+        'en_route': en_route,
+        'delivered': delivered,
+    }
+
+
+'''
+Serves a plan until the process is interrupted.
+'''
+async def serve(plan, host='127.0.0.1', port=8080):
+    server = await StatusService(plan).start(host, port)
+    address = server.sockets[0].getsockname()
+    print('Serving package status on http://%s:%d' % (address[0], address[1]))
+    async with server:
+        await server.serve_forever()
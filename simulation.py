@@ -0,0 +1,392 @@
+import argparse
+import heapq
+import json
+import sys
+import time
+
+from clock import seconds, format_seconds
+from netcache import load_cached_network
+from ingest import read_manifest
+from assignment import parse_notes
+from optimizer import DeadlineAware, get_optimizer, OPTIMIZERS
+
+'''
+Discrete-event fleet simulation for offline capacity planning.
+A heap of timestamped events drives the clock; nothing happens between events. The model has
+any number of depots, each with its own trucks and a limited number of drivers. Packages
+reach their nearest depot when they are released: at the start of the day, or later for
+"Delayed on flight" and wrong-address notes. A depot sends an idle truck out when a driver is
+free and it can fill the truck or no more packages are due soon. Each trip is routed with a
+route optimizer and ends back at the depot, where the truck reloads. Packages not delivered by
+the end of a day carry over to the next, for as many days as the demand covers.
+
+Trips are planned whole when they leave, so a trip costs one heap event (its return) however
+many stops it makes.
+Times are absolute seconds from midnight of day 0.
+'''
+
+DAY = seconds(24)
+
+# Event kinds; at the same instant, returns and arrivals are handled before a new day opens.
+RETURN = 0    # A truck is back at its depot and its driver is free
+ARRIVAL = 1   # A batch of packages reaches a depot
+DAY_START = 2  # Drivers start a new day
+
+
+class Depot:
+    '''
+    A depot: its address, the number of trucks based there and the drivers on duty each day.
+    '''
+    def __init__(self, address, trucks=3, drivers=2, capacity=16, speed=18):
+        self.address = address
+        self.trucks = trucks
+        self.drivers = drivers
+        self.capacity = capacity  # Packages per truck
+        self.speed = speed        # Miles per hour
+
+
+class Vehicle:
+    '''
+    One simulated truck and its running totals.
+    '''
+    __slots__ = ('depot', 'number', 'miles', 'trips', 'driving', 'days')
+
+    def __init__(self, depot, number):
+        self.depot = depot    # Index of the home depot
+        self.number = number  # Truck number, unique across depots
+        self.miles = 0.0      # Miles driven, including the legs back to the depot
+        self.trips = 0        # Trips driven
+        self.driving = 0.0    # Seconds spent driving
+        self.days = set()     # Days the truck left the depot at least once
+
+
+class Order:
+    '''
+    One package on one simulated day. Deadlines and release times are absolute seconds, so a
+    route optimizer can plan with them exactly as it does with a single day's packages.
+    '''
+    __slots__ = ('package', 'day', 'address', 'stop', 'depot', 'ready', 'deadline', 'delivered')
+
+    def __init__(self, package, day, stop, depot, ready, deadline):
+        self.package = package    # The manifest Package (never modified)
+        self.day = day            # Day the package was released on
+        self.address = package.address
+        self.stop = stop          # Delivery stop ID
+        self.depot = depot        # Index of the depot it ships from
+        self.ready = ready        # Time it reaches the depot
+        self.deadline = deadline  # Absolute deadline, or None for EOD
+        self.delivered = None     # Absolute delivery time once delivered
+
+
+class _DepotState:
+    '''
+    The live state of a depot during a run.
+    '''
+    def __init__(self, depot, stop):
+        self.depot = depot
+        self.stop = stop
+        self.idle = []           # Vehicles parked at the depot
+        self.drivers = depot.drivers
+        self.waiting = []        # Orders at the depot that have not left yet
+        self.arrivals = []       # Release times still to come, sorted
+        self.next_arrival = 0    # Index into arrivals
+
+
+class Simulation:
+    '''
+    Simulates a fleet over one or more days.
+    - depots: Depot objects; every package ships from the depot nearest its stop.
+    - day_start / day_end: the first and last time (seconds since midnight) a truck may leave.
+    - max_hold: how long a depot holds a truck that is not full for packages that are about to
+      arrive.
+    - address_hold: release time of packages held for a wrong address.
+    The optimizer defaults to DeadlineAware with a small per-trip time budget.
+    '''
+    def __init__(self, network, depots, optimizer=None, day_start=seconds(8), day_end=seconds(17),
+                 max_hold=seconds(0, 30), address_hold=seconds(10, 20)):
+        self.network = network
+        self.depots = depots
+        self.optimizer = optimizer if optimizer is not None else DeadlineAware(time_budget=0.01)
+        self.day_start = day_start
+        self.day_end = day_end
+        self.max_hold = max_hold
+        self.address_hold = address_hold
+        self.depot_stops = []
+        for depot in depots:
+            stop = network.address_to_id(depot.address)
+            if stop is None:
+                raise ValueError('Unknown depot address: %s' % depot.address)
+            self.depot_stops.append(stop)
+
+    '''
+    Builds the Orders for one day of packages and groups their releases by (time, depot).
+    Notes are parsed once per distinct text and each stop's nearest depot is looked up once.
+    Time Complexity: O(N * D), where D is the number of depots, for stops not seen before.
+    '''
+    def _release(self, day, packages, notes_cache, depot_of_stop, releases):
+        base = day * DAY
+        orders = []
+        for package in packages:
+            constraints = notes_cache.get(package.notes)
+            if constraints is None:
+                constraints = notes_cache[package.notes] = parse_notes(package.notes)
+            stop = self.network.address_to_id(package.address)
+            if stop is None:
+                raise ValueError('Unknown address for package %s: %s' % (package.package_id, package.address))
+            depot = depot_of_stop.get(stop)
+            if depot is None:
+                depot = depot_of_stop[stop] = min(range(len(self.depots)),
+                                                  key=lambda index: self.network.distance(self.depot_stops[index], stop))
+            ready = self.day_start
+            if constraints.available_at is not None:
+                ready = max(ready, constraints.available_at)
+            if constraints.wrong_address:
+                ready = max(ready, self.address_hold)
+            deadline = None if package.deadline is None else base + package.deadline
+            order = Order(package, day, stop, depot, base + ready, deadline)
+            releases.setdefault((base + ready, depot), []).append(order)
+            orders.append(order)
+        return orders
+
+    '''
+    Runs the simulation.
+    - days: one iterable of Package objects per day (the same manifest may be repeated).
+    Returns a SimulationResult.
+    Time Complexity: O(E log E) for the event queue plus the routing cost of every trip, where E
+    is the number of events (releases, returns and day starts).
+    '''
+    def run(self, days):
+        started = time.perf_counter()
+        states = [_DepotState(depot, stop) for depot, stop in zip(self.depots, self.depot_stops)]
+        vehicles = []
+        for index, state in enumerate(states):
+            for i in range(state.depot.trucks):
+                vehicle = Vehicle(index, len(vehicles) + 1)
+                vehicles.append(vehicle)
+                state.idle.append(vehicle)
+
+        events = []
+        sequence = 0
+        notes_cache = {}
+        depot_of_stop = {}
+        orders = []
+        releases = {}
+        day_count = 0
+        for day, packages in enumerate(days):
+            orders.extend(self._release(day, packages, notes_cache, depot_of_stop, releases))
+            heapq.heappush(events, (day * DAY + self.day_start, DAY_START, sequence, None))
+            sequence += 1
+            day_count = day + 1
+        for (ready, depot), batch in releases.items():
+            states[depot].arrivals.append(ready)
+            heapq.heappush(events, (ready, ARRIVAL, sequence, (depot, batch)))
+            sequence += 1
+        for state in states:
+            state.arrivals.sort()
+
+        trips = []
+        processed = 0
+        while events:
+            now, kind, _, payload = heapq.heappop(events)
+            processed += 1
+            if kind == RETURN:
+                vehicle = payload
+                state = states[vehicle.depot]
+                state.idle.append(vehicle)
+                state.drivers += 1
+                ready_states = (state,)
+            elif kind == ARRIVAL:
+                depot, batch = payload
+                state = states[depot]
+                state.waiting.extend(batch)
+                while state.next_arrival < len(state.arrivals) and state.arrivals[state.next_arrival] <= now:
+                    state.next_arrival += 1
+                ready_states = (state,)
+            else:
+                ready_states = states
+            for state in ready_states:
+                for trip in self._dispatch(state, now):
+                    trips.append(trip)
+                    heapq.heappush(events, (trip.returned, RETURN, sequence, trip.vehicle))
+                    sequence += 1
+
+        return SimulationResult(orders, trips, vehicles, day_count, self.day_end, processed,
+                                time.perf_counter() - started)
+
+    '''
+    Sends out idle trucks from a depot while it has drivers, packages and a reason not to wait.
+    Returns the Trips that left.
+    Time Complexity: O(W log W) per trip to choose the load, plus the routing cost.
+    '''
+    def _dispatch(self, state, now):
+        trips = []
+        day, clock = divmod(now, DAY)
+        day = int(day)
+        if clock < self.day_start or clock > self.day_end:
+            return trips
+        depot = state.depot
+        while state.idle and state.drivers > 0 and state.waiting:
+            if len(state.waiting) < depot.capacity and state.next_arrival < len(state.arrivals):
+                upcoming = state.arrivals[state.next_arrival]
+                if upcoming - now <= self.max_hold and upcoming <= day * DAY + self.day_end:
+                    break  # The arrival event dispatches again.
+            load = self._choose_load(state, depot.capacity)
+            vehicle = state.idle.pop()
+            state.drivers -= 1
+            trips.append(self._drive(vehicle, state, load, now, day))
+        return trips
+
+    '''
+    Picks up to capacity waiting orders: the most urgent order (earliest deadline, then longest
+    waiting) first, then the remaining deadline orders, then the orders closest to the first one.
+    Time Complexity: O(W log W), where W is the number of waiting orders.
+    '''
+    def _choose_load(self, state, capacity):
+        waiting = state.waiting
+        if len(waiting) <= capacity:
+            state.waiting = []
+            return waiting
+        waiting.sort(key=lambda order: (order.deadline is None, order.deadline or 0, order.ready))
+        seed = waiting[0].stop
+        urgent = [order for order in waiting if order.deadline is not None][:capacity]
+        rest = waiting[len(urgent):]
+        distance = self.network.distance
+        rest.sort(key=lambda order: distance(seed, order.stop))
+        take = capacity - len(urgent)
+        state.waiting = rest[take:]
+        return urgent + rest[:take]
+
+    '''
+    Routes one trip from the depot and back, records the deliveries and returns the Trip.
+    '''
+    def _drive(self, vehicle, state, load, now, day):
+        depot = state.depot
+        route = self.optimizer.solve(self.network, state.stop, load, depot.speed, now)
+        back = self.network.distance(route.stops[-1], state.stop) if route.stops else 0
+        end = route.etas[-1] if route.etas else now
+        returned = end + back / depot.speed * 3600
+        for order, eta in zip(route.packages, route.etas):
+            order.delivered = eta
+        miles = route.distance + back
+        vehicle.miles += miles
+        vehicle.trips += 1
+        vehicle.driving += returned - now
+        vehicle.days.add(day)
+        return Trip(vehicle, day, now, returned, route.packages, miles)
+
+
+class Trip:
+    '''
+    One truck trip: when it left and came back, the orders it delivered and its mileage.
+    '''
+    __slots__ = ('vehicle', 'day', 'departed', 'returned', 'orders', 'miles')
+
+    def __init__(self, vehicle, day, departed, returned, orders, miles):
+        self.vehicle = vehicle
+        self.day = day
+        self.departed = departed
+        self.returned = returned
+        self.orders = orders
+        self.miles = miles
+
+
+class SimulationResult:
+    '''
+    The outcome of a run: every order with its delivery time, every trip and every vehicle,
+    plus the number of events processed and the wall time the run took.
+    '''
+    def __init__(self, orders, trips, vehicles, days, day_end, events, elapsed):
+        self.orders = orders
+        self.trips = trips
+        self.vehicles = vehicles
+        self.days = days
+        self.day_end = day_end
+        self.events = events
+        self.elapsed = elapsed
+
+    '''
+    Returns the number of (truck, day) pairs in which a truck left its depot.
+    '''
+    def truck_days(self):
+        return sum(len(vehicle.days) for vehicle in self.vehicles)
+
+    '''
+    Returns the per-day and total figures as JSON-ready data.
+    Time Complexity: O(N + T), where N is the number of orders and T the number of trips.
+    '''
+    def summary(self):
+        per_day = [{'day': day, 'released': 0, 'delivered': 0, 'late': 0, 'carried_over': 0, 'trips': 0,
+                    'miles': 0.0, 'trucks_used': 0, 'last_return': None} for day in range(self.days)]
+        for order in self.orders:
+            stats = per_day[order.day]
+            stats['released'] += 1
+            if order.delivered is None:
+                continue
+            delivered_day = min(int(order.delivered // DAY), self.days - 1)
+            per_day[delivered_day]['delivered'] += 1
+            if delivered_day > order.day:
+                stats['carried_over'] += 1
+            if order.deadline is not None and order.delivered > order.deadline:
+                per_day[delivered_day]['late'] += 1
+        trucks = [set() for day in range(self.days)]
+        for trip in self.trips:
+            stats = per_day[trip.day]
+            stats['trips'] += 1
+            stats['miles'] += trip.miles
+            trucks[trip.day].add(trip.vehicle.number)
+            if stats['last_return'] is None or trip.returned > stats['last_return']:
+                stats['last_return'] = trip.returned
+        for stats, used in zip(per_day, trucks):
+            stats['miles'] = round(stats['miles'], 1)
+            stats['trucks_used'] = len(used)
+            if stats['last_return'] is not None:
+                stats['last_return'] = format_seconds(stats['last_return'] - stats['day'] * DAY)
+        delivered = sum(stats['delivered'] for stats in per_day)
+        return {
+            'days': per_day,
+            'totals': {
+                'packages': len(self.orders),
+                'delivered': delivered,
+                'undelivered': len(self.orders) - delivered,
+                'late': sum(stats['late'] for stats in per_day),
+                'trips': len(self.trips),
+                'miles': round(sum(trip.miles for trip in self.trips), 1),
+                'truck_days': self.truck_days(),
+                'events': self.events,
+                'seconds': round(self.elapsed, 3),
+                'truck_days_per_minute': round(self.truck_days() / self.elapsed * 60) if self.elapsed > 0 else None,
+            },
+        }
+
+
+'''
+Runs a simulation from the command line:
+    python simulation.py --days 30 [--depot ADDRESS TRUCKS DRIVERS ...] [--output report.json]
+The manifest is repeated every day. Without --depot the WGUPS hub is used with 3 trucks and 2 drivers.
+'''
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Simulate the delivery fleet over several days.')
+    parser.add_argument('--manifest', default='programdata/package_data.csv')
+    parser.add_argument('--distances', default='programdata/distance_table.csv')
+    parser.add_argument('--stops', default='programdata/stops.csv')
+    parser.add_argument('--days', type=int, default=1)
+    parser.add_argument('--depot', nargs=3, action='append', metavar=('ADDRESS', 'TRUCKS', 'DRIVERS'))
+    parser.add_argument('--capacity', type=int, default=16)
+    parser.add_argument('--speed', type=float, default=18)
+    parser.add_argument('--optimizer', choices=sorted(OPTIMIZERS), default='deadline')
+    parser.add_argument('--time-budget', type=float, default=0.01, help='route improvement seconds per trip')
+    parser.add_argument('--output', help='write the JSON report here instead of stdout')
+    args = parser.parse_args()
+
+    network = load_cached_network(args.distances, args.stops)
+    manifest = list(read_manifest(args.manifest))
+    depots = [Depot(address, int(trucks), int(drivers), args.capacity, args.speed)
+              for address, trucks, drivers in (args.depot or [('4001 South 700 East', 3, 2)])]
+    simulation = Simulation(network, depots, get_optimizer(args.optimizer, time_budget=args.time_budget))
+    report = simulation.run([manifest] * args.days).summary()
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(report, output, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
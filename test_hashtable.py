@@ -0,0 +1,66 @@
+import random
+
+from hashtable import HashTable, _MULTIPLIER, _WORD, _EMPTY, _DELETED
+
+'''
+Regression tests for the open-addressing HashTable. Run with: python -m pytest -q
+'''
+
+
+'''
+Inserts, replaces, removes and looks up random keys, checking every step against a dict.
+'''
+def test_matches_dict():
+    rng = random.Random(6)
+    table = HashTable()
+    expected = {}
+    for step in range(20000):
+        key = rng.randrange(-500, 500)
+        action = rng.random()
+        if action < 0.5:
+            table.insert(key, step)
+            expected[key] = step
+        elif action < 0.8:
+            table.remove(key)
+            expected.pop(key, None)
+        else:
+            assert table.lookup(key) == expected.get(key)
+            assert (key in table) == (key in expected)
+        assert len(table) == len(expected)
+    assert dict(table.items()) == expected
+    assert sorted(table) == sorted(expected)
+
+
+'''
+Returns the longest distance any key sits from its home slot, i.e. the longest probe a lookup makes.
+'''
+def longest_probe(table):
+    mask = len(table._keys) - 1
+    return max((index - ((hash(key) * _MULTIPLIER & _WORD) >> table._shift)) & mask
+               for index, key in enumerate(table._keys) if key is not _EMPTY and key is not _DELETED)
+
+
+'''
+Keys that share their low bits used to pile into one probe chain (20,000 multiples of 2^20 made
+a single run thousands of slots long); mixed hashing spreads them out.
+'''
+def test_keys_sharing_low_bits_do_not_cluster():
+    keys = [i << 20 for i in range(20000)]
+    table = HashTable.from_items((key, key) for key in keys)
+    assert all(table.lookup(key) == key for key in keys)
+    assert longest_probe(table) < 16
+
+
+'''
+Removing everything and inserting again reuses tombstones instead of growing without bound.
+'''
+def test_tombstones_are_reclaimed():
+    table = HashTable()
+    for round_number in range(50):
+        for key in range(100):
+            table.insert(key, round_number)
+        for key in range(100):
+            table.remove(key)
+    assert len(table) == 0
+    assert len(table._keys) <= 256
+    assert table.lookup(5) is None
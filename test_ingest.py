@@ -0,0 +1,133 @@
+from array import array
+
+from hashtable import HashTable
+from ingest import read_manifest, read_batches, load_manifest, apply_delta
+from network import Network
+
+'''
+Tests for manifest ingestion: row validation and reject reasons, reject line numbers, batching
+and delta manifests. Run with: python -m pytest -q
+'''
+
+GOOD = '1,195 W Oakland Ave,Salt Lake City,84115,UT,10:30 AM,21,\n'
+
+
+'''
+Writes text to a file in the test's temporary directory and returns its path.
+'''
+def write(tmp_path, name, text):
+    path = tmp_path / name
+    path.write_text(text)
+    return str(path)
+
+
+'''
+A two-stop network: the hub and 195 W Oakland Ave.
+'''
+def small_network():
+    stops = [(0, 'Hub', ' 4001 South 700 East\n(84107)'), (1, 'Oakland', ' 195 W Oakland Ave\n(84115)')]
+    return Network(2, array('d', [0.0, 3.5, 3.5, 0.0]), stops)
+
+
+def test_valid_rows_become_packages(tmp_path):
+    manifest = write(tmp_path, 'manifest.csv', GOOD + '2, 195 W Oakland Ave ,Salt Lake City,84115,UT,EOD,2.5')
+    rejects = []
+    packages = list(read_manifest(manifest, rejects))
+    assert rejects == []
+    assert [package.package_id for package in packages] == [1, 2]
+    assert packages[0].deadline == 10 * 3600 + 30 * 60
+    assert packages[1].deadline is None
+    assert packages[1].address == '195 W Oakland Ave'
+    assert packages[1].weight == 2.5
+    assert packages[1].notes == ''
+
+
+def test_each_reject_reason(tmp_path):
+    rows = [
+        '3,195 W Oakland Ave,Salt Lake City,84115,UT',                # too few columns
+        'x,195 W Oakland Ave,Salt Lake City,84115,UT,EOD,1,',         # invalid package ID
+        '4, ,Salt Lake City,84115,UT,EOD,1,',                         # missing address
+        '5,195 W Oakland Ave,Salt Lake City,84115,UT,EOD,heavy,',     # invalid weight
+        '6,195 W Oakland Ave,Salt Lake City,84115,UT,EOD,nan,',       # not finite
+        '7,195 W Oakland Ave,Salt Lake City,84115,UT,EOD,-1,',        # negative weight
+        '8,195 W Oakland Ave,Salt Lake City,84115,UT,25:99 XM,1,',    # invalid deadline
+        '1,195 W Oakland Ave,Salt Lake City,84115,UT,EOD,1,',         # duplicate ID
+        '9,999 Nowhere Blvd,Salt Lake City,84115,UT,EOD,1,',          # unknown address
+    ]
+    manifest = write(tmp_path, 'manifest.csv', GOOD + '\n'.join(rows) + '\n')
+    rejects = []
+    packages = list(read_manifest(manifest, rejects, small_network()))
+    assert [package.package_id for package in packages] == [1]
+    reasons = [reject.reason for reject in rejects]
+    assert reasons[0].startswith('expected 8 columns')
+    assert reasons[1].startswith('invalid package ID')
+    assert reasons[2] == 'missing address'
+    assert reasons[3].startswith('invalid weight')
+    assert reasons[4].startswith('invalid weight')
+    assert reasons[5].startswith('negative weight')
+    assert reasons[6].startswith('invalid deadline')
+    assert reasons[7] == 'duplicate package ID 1'
+    assert reasons[8] == "unknown address '999 Nowhere Blvd'"
+    assert [reject.line for reject in rejects] == list(range(2, 11))
+
+
+def test_rejects_report_file_lines_after_multiline_fields(tmp_path):
+    manifest = write(tmp_path, 'manifest.csv',
+                     GOOD + '2,195 W Oakland Ave,Salt Lake City,84115,UT,EOD,1,"two\nline note"\n\n'
+                     + '3,195 W Oakland Ave,Salt Lake City,84115,UT,EOD,heavy,\n')
+    rejects = []
+    assert len(list(read_manifest(manifest, rejects))) == 2
+    assert [reject.line for reject in rejects] == [5]
+
+
+def test_read_batches_splits_in_file_order(tmp_path):
+    rows = ''.join('%d,195 W Oakland Ave,Salt Lake City,84115,UT,EOD,1,\n' % pid for pid in range(1, 8))
+    manifest = write(tmp_path, 'manifest.csv', rows + 'x,bad row\n')
+    rejects = []
+    batches = list(read_batches(manifest, 3, rejects))
+    assert [[package.package_id for package in batch] for batch in batches] == [[1, 2, 3], [4, 5, 6], [7]]
+    assert len(rejects) == 1
+
+
+def test_apply_delta_add_cancel_correct(tmp_path):
+    manifest = write(tmp_path, 'manifest.csv',
+                     GOOD + '2,195 W Oakland Ave,Salt Lake City,84115,UT,EOD,2,\n')
+    table = HashTable()
+    load_manifest(manifest, table)
+    table.lookup(1).truck_number = 3
+    delta = write(tmp_path, 'delta.csv',
+                  'add,5,195 W Oakland Ave,Salt Lake City,84115,UT,EOD,4,\n'
+                  'cancel,2\n'
+                  'CORRECT,1,4001 South 700 East,Salt Lake City,84107,UT,9:00 AM,7,Call first\n')
+    rejects = []
+    assert apply_delta(delta, table, rejects) == {'add': 1, 'cancel': 1, 'correct': 1}
+    assert rejects == []
+    assert sorted(table) == [1, 5]
+    corrected = table.lookup(1)
+    assert (corrected.address, corrected.zipcode, corrected.deadline, corrected.weight, corrected.notes) == (
+        '4001 South 700 East', '84107', 9 * 3600, 7.0, 'Call first')
+    assert corrected.truck_number == 3  # Routing results are kept
+
+
+def test_apply_delta_reject_reasons(tmp_path):
+    manifest = write(tmp_path, 'manifest.csv', GOOD)
+    table = HashTable()
+    load_manifest(manifest, table)
+    delta = write(tmp_path, 'delta.csv',
+                  'move,1\n'
+                  'cancel,one\n'
+                  'cancel,8\n'
+                  'add,1,195 W Oakland Ave,Salt Lake City,84115,UT,EOD,1,\n'
+                  'correct,8,195 W Oakland Ave,Salt Lake City,84115,UT,EOD,1,\n'
+                  'add,9,195 W Oakland Ave,Salt Lake City,84115,UT,EOD,-3,\n')
+    rejects = []
+    assert apply_delta(delta, table, rejects) == {'add': 0, 'cancel': 0, 'correct': 0}
+    assert [(reject.line, reject.reason) for reject in rejects] == [
+        (1, "unknown action 'move'"),
+        (2, 'invalid package ID'),
+        (3, 'unknown package ID 8'),
+        (4, 'package ID 1 already loaded'),
+        (5, 'unknown package ID 8'),
+        (6, "negative weight '-3'"),
+    ]
+    assert sorted(table) == [1]
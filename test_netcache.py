@@ -0,0 +1,51 @@
+import os
+
+from netcache import load_cached_network, cache_path
+
+'''
+Tests for the binary network cache: placement, dtype and recovery from damaged files.
+Run with: python -m pytest -q
+'''
+
+DISTANCES = '0\n1.5,0\n2.25,3.5,0\n'
+
+
+'''
+Writes the source CSVs to the test's temporary directory and returns their paths.
+'''
+def sources(tmp_path):
+    distance_file = tmp_path / 'distance_table.csv'
+    stops_file = tmp_path / 'stops.csv'
+    distance_file.write_text(DISTANCES)
+    stops_file.write_text('"0","Hub"," 4001 South 700 East\n(84107)"\n'
+                          '"1","Oakland"," 195 W Oakland Ave\n(84115)"\n'
+                          '"2","State"," 410 S State St\n(84111)"\n')
+    return str(distance_file), str(stops_file)
+
+
+def test_cache_is_written_next_to_the_sources(tmp_path):
+    distance_file, stops_file = sources(tmp_path)
+    network = load_cached_network(distance_file, stops_file)
+    assert network.cache_file == os.path.abspath(cache_path(distance_file))
+    assert sorted(os.listdir(tmp_path)) == ['distance_table.csv', 'network.bin', 'stops.csv']
+    assert network.distance(2, 1) == 3.5
+    assert network.address_to_id('410 S State St') == 2
+
+
+def test_dtype_mismatch_recompiles(tmp_path):
+    distance_file, stops_file = sources(tmp_path)
+    assert load_cached_network(distance_file, stops_file, dtype='f').matrix.format == 'f'
+    assert load_cached_network(distance_file, stops_file, dtype='d').matrix.format == 'd'
+    assert load_cached_network(distance_file, stops_file, dtype='f').matrix.format == 'f'
+
+
+def test_truncated_cache_is_rebuilt(tmp_path):
+    distance_file, stops_file = sources(tmp_path)
+    cache_file = cache_path(distance_file)
+    load_cached_network(distance_file, stops_file)
+    size = os.path.getsize(cache_file)
+    with open(cache_file, 'r+b') as cache:
+        cache.truncate(size - 8)
+    network = load_cached_network(distance_file, stops_file)
+    assert network.distance(0, 2) == 2.25
+    assert os.path.getsize(cache_file) == size
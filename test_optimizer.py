@@ -0,0 +1,84 @@
+import random
+
+from optimizer import TimeWindows, EPSILON, INFINITY
+
+'''
+Checks the O(1) TimeWindows feasibility tests against driving every candidate tour in full.
+Run with: python -m pytest -q
+'''
+
+
+'''
+Returns a random symmetric travel function, deadlines and starting tour over n nodes.
+About half the nodes (never the start) get a deadline.
+'''
+def random_instance(rng, n):
+    points = [(rng.uniform(0, 10), rng.uniform(0, 10)) for _ in range(n)]
+
+    def travel(a, b):
+        return ((points[a][0] - points[b][0]) ** 2 + (points[a][1] - points[b][1]) ** 2) ** 0.5 * 200
+
+    due = [INFINITY] + [rng.choice([INFINITY, rng.uniform(0, 8000)]) for _ in range(n - 1)]
+    tour = [0] + rng.sample(range(1, n), n - 1)
+    return travel, due, tour
+
+
+'''
+Returns True if driving the tour from its start reaches every node by its deadline.
+Time Complexity: O(N)
+'''
+def on_time(travel, due, tour):
+    clock = 0.0
+    for i in range(1, len(tour)):
+        clock += travel(tour[i - 1], tour[i])
+        if clock > due[tour[i]] + EPSILON:
+            return False
+    return True
+
+
+def test_reversal_fits_matches_brute_force():
+    rng = random.Random(14)
+    for trial in range(500):
+        n = rng.randint(3, 14)
+        travel, due, tour = random_instance(rng, n)
+        windows = TimeWindows(travel, tour, due)
+        for p in range(n):
+            for q in range(p + 2, n):
+                candidate = tour[:p + 1] + tour[p + 1:q + 1][::-1] + tour[q + 1:]
+                assert windows.reversal_fits(p, q) == on_time(travel, due, candidate), (tour, p, q)
+
+
+def test_move_fits_matches_brute_force():
+    rng = random.Random(15)
+    for trial in range(500):
+        n = rng.randint(3, 14)
+        travel, due, tour = random_instance(rng, n)
+        windows = TimeWindows(travel, tour, due)
+        for start in range(1, n):
+            for end in range(start, min(start + 3, n)):
+                for after in range(n):
+                    if start - 1 <= after <= end:
+                        continue
+                    for reverse in (False, True):
+                        segment = tour[start:end + 1]
+                        if reverse:
+                            segment = segment[::-1]
+                        rest = tour[:start] + tour[end + 1:]
+                        at = rest.index(tour[after]) + 1
+                        candidate = rest[:at] + segment + rest[at:]
+                        assert (windows.move_fits(start, end, after, reverse)
+                                == on_time(travel, due, candidate)), (tour, start, end, after, reverse)
+
+
+'''
+After relax() the current tour counts as on time, and the late nodes are reported latest first.
+'''
+def test_relax_accepts_current_tour():
+    rng = random.Random(16)
+    for trial in range(200):
+        travel, due, tour = random_instance(rng, rng.randint(3, 14))
+        windows = TimeWindows(travel, tour, due)
+        late = windows.relax()
+        assert windows.fits([windows.stretch(0, len(tour) - 1)])
+        assert on_time(travel, windows.due, tour)
+        assert bool(late) != on_time(travel, due, tour)
@@ -0,0 +1,104 @@
+import random
+from array import array
+
+import pytest
+
+from clock import seconds
+from engine import Fleet, plan_day
+from network import Network
+from package import Package, PackageStatus
+
+'''
+Tests mid-route re-planning: random address changes must keep what was driven before the change,
+finish the leg in progress and leave the other trucks alone. Run with: python -m pytest -q
+'''
+
+HUB = '0 Hub Way'
+
+
+'''
+Returns a random network of stops on a plane (stop 0 is the hub) and their street addresses.
+'''
+def random_network(rng, size):
+    addresses = [HUB] + ['%d Test St' % number for number in range(1, size)]
+    points = [(rng.uniform(0, 10), rng.uniform(0, 10)) for _ in addresses]
+    matrix = array('d', [round(((x1 - x2) ** 2 + (y1 - y2) ** 2) ** 0.5, 1)
+                         for x1, y1 in points for x2, y2 in points])
+    stops = [(stop_id, 'Stop %d' % stop_id, ' %s\n(84100)' % address) for stop_id, address in enumerate(addresses)]
+    return Network(size, matrix, stops), addresses
+
+
+'''
+Plans a random three-truck day; some packages share stops and a few have deadlines.
+'''
+def random_plan(rng):
+    network, addresses = random_network(rng, 15)
+    packages = [Package(pid, rng.choice(addresses[1:]), 'Salt Lake City', '84100', 'UT',
+                        rng.choice([None, None, None, seconds(10, 30)]), 1.0, '', PackageStatus.AT_HUB, None, None)
+                for pid in range(1, 31)]
+    fleet = Fleet(hub=HUB, departures=[seconds(8), seconds(9, 10), seconds(10, 30)], capacity=12, trucks=3)
+    return plan_day(packages, network, fleet), addresses
+
+
+'''
+Returns a route's package IDs and ETAs.
+'''
+def snapshot(route):
+    return [package.package_id for package in route.packages], list(route.etas)
+
+
+def test_random_mid_route_changes():
+    rng = random.Random(10)
+    for trial in range(50):
+        plan, addresses = random_plan(rng)
+        index = rng.randrange(len(plan.routes))
+        route = plan.routes[index]
+        truck = plan.trucks[index]
+        position = rng.randrange(len(route.packages))
+        package = route.packages[position]
+        effective = rng.randint(truck.departure_time - 600, route.etas[position] - 1)
+        new_address = rng.choice([address for address in addresses[1:] if address != package.address])
+        before = [snapshot(other) for other in plan.routes]
+        distances = [other.distance for other in plan.trucks]
+        old_ids, old_etas = before[index]
+
+        new_route = plan.apply_address_change(package.package_id, new_address, effective)
+
+        # Other trucks are untouched.
+        for other in range(len(plan.routes)):
+            if other != index:
+                assert snapshot(plan.routes[other]) == before[other]
+                assert plan.trucks[other].distance == distances[other]
+
+        new_ids, new_etas = snapshot(new_route)
+        assert sorted(new_ids) == sorted(old_ids)
+        # Deliveries made before the change keep their order and times.
+        done = sum(1 for eta in old_etas if eta <= effective)
+        assert new_ids[:done] == old_ids[:done]
+        assert new_etas[:done] == old_etas[:done]
+        # A truck already on the road finishes its leg: the other packages for the stop it is
+        # driving to are delivered next, at the same time as before.
+        if effective >= truck.departure_time:
+            end = done
+            while end < len(old_ids) and route.stops[end] == route.stops[done]:
+                end += 1
+            finishing = [pid for pid in old_ids[done:end] if pid != package.package_id]
+            assert new_ids[done:done + len(finishing)] == finishing
+            assert new_etas[done:done + len(finishing)] == [old_etas[old_ids.index(pid)] for pid in finishing]
+        # The corrected package goes to its new address after the change.
+        corrected = new_ids.index(package.package_id)
+        assert package.address == new_address
+        assert new_route.stops[corrected] == plan.network.address_to_id(new_address)
+        assert new_etas[corrected] > effective
+        # Truck totals and package times match the new route.
+        assert abs(truck.distance - new_route.distance) < 1e-6
+        assert [p.time_delivered for p in new_route.packages] == new_etas
+        assert new_etas == sorted(new_etas)
+        assert plan.routes[index] is new_route
+
+
+def test_delivered_packages_cannot_be_changed():
+    plan, addresses = random_plan(random.Random(11))
+    route = plan.routes[0]
+    with pytest.raises(ValueError, match='delivered before the address change'):
+        plan.apply_address_change(route.packages[0].package_id, addresses[1], route.etas[0])
@@ -0,0 +1,153 @@
+import asyncio
+import json
+from array import array
+
+from clock import seconds
+from engine import Fleet, plan_day
+from network import Network
+from package import PackageStatus
+from service import StatusService
+
+'''
+Tests the HTTP status service against a server on a free localhost port.
+Run with: python -m pytest -q
+'''
+
+HUB = '4001 South 700 East'
+STOPS = [HUB, '195 W Oakland Ave', '410 S State St', '300 State St']
+DISTANCES = [
+    [0.0, 3.0, 5.0, 4.0],
+    [3.0, 0.0, 2.0, 6.0],
+    [5.0, 2.0, 0.0, 1.0],
+    [4.0, 6.0, 1.0, 0.0],
+]
+MANIFEST = ('1,195 W Oakland Ave,Salt Lake City,84115,UT,10:30 AM,5,\n'
+            '2,410 S State St,Salt Lake City,84111,UT,EOD,3,\n'
+            '3,300 State St,Salt Lake City,84103,UT,EOD,2,\n')
+
+
+'''
+Plans a one-truck day (leaving at 8:00) over a four-stop network.
+'''
+def small_plan(tmp_path):
+    stops = [(stop_id, 'Stop %d' % stop_id, ' %s\n(84100)' % address) for stop_id, address in enumerate(STOPS)]
+    network = Network(len(STOPS), array('d', [cell for row in DISTANCES for cell in row]), stops)
+    manifest = tmp_path / 'manifest.csv'
+    manifest.write_text(MANIFEST)
+    return plan_day(str(manifest), network, Fleet(hub=HUB, departures=[seconds(8)], trucks=1))
+
+
+'''
+Sends one raw request and returns (status code, decoded JSON body).
+'''
+async def send(port, raw):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(raw)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, body = response.partition(b'\r\n\r\n')
+    return int(head.split()[1]), json.loads(body)
+
+
+async def request(port, method, target, document=None):
+    body = json.dumps(document).encode() if document is not None else b''
+    return await send(port, b'%s %s HTTP/1.1\r\nConnection: close\r\nContent-Length: %d\r\n\r\n'
+                      % (method.encode(), target.encode(), len(body)) + body)
+
+
+'''
+Starts the service for plan on a free port, runs exchange(port) and shuts the server down.
+'''
+def serve(plan, exchange):
+    async def run():
+        server = await StatusService(plan).start(port=0)
+        try:
+            return await exchange(server.sockets[0].getsockname()[1])
+        finally:
+            server.close()
+            await server.wait_closed()
+    return asyncio.run(run())
+
+
+def test_single_package(tmp_path):
+    async def exchange(port):
+        before = await request(port, 'GET', '/packages/1?at=07:00:00')
+        after = await request(port, 'GET', '/packages/1')
+        missing = await request(port, 'GET', '/packages/99')
+        bad_time = await request(port, 'GET', '/packages/1?at=noon')
+        return before, after, missing, bad_time
+
+    before, after, missing, bad_time = serve(small_plan(tmp_path), exchange)
+    assert before[0] == 200 and before[1]['at'] == '7:00:00'
+    assert before[1]['package']['status'] == PackageStatus.AT_HUB
+    assert after[1]['package']['status'] == PackageStatus.DELIVERED
+    assert after[1]['package']['truck'] == 1
+    assert missing[0] == 404
+    assert bad_time[0] == 400
+
+
+def test_bulk_packages(tmp_path):
+    async def exchange(port):
+        listed = await request(port, 'GET', '/packages?ids=1,3,99&at=08:00:00')
+        posted = await request(port, 'POST', '/packages', {'ids': [2], 'at': '23:00:00'})
+        everything = await request(port, 'GET', '/packages')
+        bad = await request(port, 'POST', '/packages', {'ids': 2})
+        return listed, posted, everything, bad
+
+    listed, posted, everything, bad = serve(small_plan(tmp_path), exchange)
+    assert [package['package_id'] for package in listed[1]['packages']] == [1, 3]
+    assert listed[1]['unknown'] == [99]
+    assert all(package['status'] == PackageStatus.EN_ROUTE for package in listed[1]['packages'])
+    assert posted[1]['packages'][0]['status'] == PackageStatus.DELIVERED
+    assert [package['package_id'] for package in everything[1]['packages']] == [1, 2, 3]
+    assert bad[0] == 400
+
+
+def test_fleet(tmp_path):
+    plan = small_plan(tmp_path)
+
+    async def exchange(port):
+        return (await request(port, 'GET', '/fleet?at=07:00:00'), await request(port, 'GET', '/fleet'),
+                await request(port, 'POST', '/fleet'))
+
+    early, late, wrong_method = serve(plan, exchange)
+    assert early[1]['at_hub'] == 3 and early[1]['delivered'] == 0
+    assert late[1]['delivered'] == 3
+    assert late[1]['total_distance'] == plan.summary()['total_distance']
+    assert [sorted(truck['packages']) for truck in late[1]['trucks']] == [[1, 2, 3]]
+    assert wrong_method[0] == 405
+
+
+def test_correction_publishes_a_new_version(tmp_path):
+    async def exchange(port):
+        corrected = await request(port, 'POST', '/corrections',
+                                  {'package_id': 3, 'address': '195 W Oakland Ave', 'at': '08:00:00',
+                                   'zipcode': '84115'})
+        before = await request(port, 'GET', '/packages/3?at=07:00:00')
+        after = await request(port, 'GET', '/packages/3')
+        unknown = await request(port, 'POST', '/corrections', {'package_id': 3, 'address': 'Nowhere'})
+        no_address = await request(port, 'POST', '/corrections', {'package_id': 3, 'address': None})
+        return corrected, before, after, unknown, no_address
+
+    corrected, before, after, unknown, no_address = serve(small_plan(tmp_path), exchange)
+    assert corrected == (200, {'version': 2})
+    assert before[1]['version'] == 2
+    assert before[1]['package']['address'] == '300 State St'
+    assert after[1]['package']['address'] == '195 W Oakland Ave'
+    assert after[1]['package']['zipcode'] == '84115'
+    assert unknown[0] == 400
+    assert no_address[0] == 400
+
+
+def test_malformed_requests_get_error_responses(tmp_path):
+    async def exchange(port):
+        long_line = await send(port, b'GET /' + b'a' * 70000 + b' HTTP/1.1\r\n\r\n')
+        long_header = await send(port, b'GET /fleet HTTP/1.1\r\nX-Long: ' + b'a' * 70000 + b'\r\n\r\n')
+        negative = await send(port, b'POST /packages HTTP/1.1\r\nContent-Length: -1\r\n\r\n')
+        return long_line, long_header, negative
+
+    long_line, long_header, negative = serve(small_plan(tmp_path), exchange)
+    assert long_line[0] == 400
+    assert long_header[0] == 431
+    assert negative[0] == 400
@@ -0,0 +1,127 @@
+from array import array
+from bisect import bisect_right
+from collections import namedtuple
+
+from package import PackageStatus
+
+'''
+An immutable, precomputed delivery timeline built once after routing.
+Load (departure) and delivery times are stored as integer seconds since midnight in flat arrays,
+and address corrections as per-package sorted event lists, so a point-in-time snapshot of one
+package or the whole manifest is answered by comparisons and binary search without touching
+(or mutating) the live Package objects.
+'''
+
+AT_HUB = PackageStatus.AT_HUB
+EN_ROUTE = PackageStatus.EN_ROUTE
+DELIVERED = PackageStatus.DELIVERED
+
+# A read-only view of a package at a point in time. Times are seconds since midnight (None if unset).
+PackageSnapshot = namedtuple('PackageSnapshot', [
+    'package_id', 'truck_number', 'weight', 'deadline', 'time_delivered', 'status',
+    'start_time', 'address', 'city', 'zipcode', 'state'])
+
+# Sentinel for packages that never leave the hub or are never delivered.
+NEVER = 2 ** 62
+
+
+class Timeline:
+    '''
+    Per-package event arrays indexed by row, with rows ordered by package ID.
+    - address_events: iterable of (package_id, effective seconds, (address, city, zipcode, state));
+      before its first event a package shows the address it was loaded with.
+    '''
+    def __init__(self, packages, address_events=()):
+        packages = sorted(packages, key=lambda package: package.package_id)
+        self.ids = tuple(package.package_id for package in packages)
+        self.rows = {pid: row for row, pid in enumerate(self.ids)}
+        self.details = tuple((package.truck_number, package.weight, package.deadline) for package in packages)
+        self.base_address = tuple((package.address, package.city, package.zipcode, package.state)
+                                  for package in packages)
+        # A package leaves the hub when its truck departs, so its load time is its departure time.
+        self.load = array('q')
+        self.deliver = array('q')
+        for package in packages:
+            start = package.start_time
+            delivered = package.time_delivered
+            self.load.append(NEVER if start is None else start)
+            self.deliver.append(NEVER if delivered is None else delivered)
+        # Sorted copies answer "how many packages have left / arrived by T" in O(log n).
+        self.sorted_load = array('q', sorted(self.load))
+        self.sorted_deliver = array('q', sorted(self.deliver))
+
+        events = {}
+        for pid, effective, address in address_events:
+            if pid in self.rows:
+                events.setdefault(self.rows[pid], []).append((effective, tuple(address)))
+        self.address_times = {}
+        self.address_values = {}
+        for row, row_events in events.items():
+            row_events.sort(key=lambda event: event[0])
+            self.address_times[row] = array('q', [event[0] for event in row_events])
+            self.address_values[row] = tuple(event[1] for event in row_events)
+
+    def __len__(self):
+        return len(self.ids)
+
+    '''
+    Returns the status string of a row at the given time.
+    Time & Space Complexity: O(1)
+    '''
+    def status(self, row, at):
+        if at < self.load[row]:
+            return AT_HUB
+        if at >= self.deliver[row]:
+            return DELIVERED
+        return EN_ROUTE
+
+    '''
+    Returns the (address, city, zipcode, state) a row shows at the given time.
+    Time Complexity: O(log E), where E is the number of corrections for the package.
+    '''
+    def address(self, row, at):
+        times = self.address_times.get(row)
+        if times is not None:
+            index = bisect_right(times, at)
+            if index > 0:
+                return self.address_values[row][index - 1]
+        return self.base_address[row]
+
+    '''
+    Builds the snapshot of one row.
+    Time Complexity: O(log E)
+    '''
+    def _snapshot(self, row, at):
+        truck_number, weight, deadline = self.details[row]
+        delivered = self.deliver[row]
+        load = self.load[row]
+        return PackageSnapshot(self.ids[row], truck_number, weight, deadline,
+                               None if delivered == NEVER else delivered, self.status(row, at),
+                               None if load == NEVER else load, *self.address(row, at))
+
+    '''
+    Returns the snapshot of a package at the given time (seconds since midnight), or None if the
+    package is unknown.
+    Time Complexity: O(1) lookup plus O(log E) for address corrections.
+    '''
+    def snapshot(self, package_id, at):
+        row = self.rows.get(package_id)
+        if row is None:
+            return None
+        return self._snapshot(row, at)
+
+    '''
+    Returns the snapshots of every package at the given time, ordered by package ID.
+    Time Complexity: O(N)
+    '''
+    def snapshot_all(self, at):
+        return [self._snapshot(row, at) for row in range(len(self.ids))]
+
+    '''
+    Returns (at hub, en route, delivered) package counts at the given time.
+    Time Complexity: O(log N)
+    '''
+    def counts(self, at):
+        departed = bisect_right(self.sorted_load, at)
+        delivered = bisect_right(self.sorted_deliver, at)
+        return len(self.ids) - departed, departed - delivered, delivered
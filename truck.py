@@ -2,15 +2,18 @@
 Represents a delivery truck used to deliver packages.
 The Truck object tracks capacity, current distance traveled, speed,
 a list of package IDs assigned for delivery, current location, delivery time, and departure time.
+Times are seconds since midnight; delivery_time is a float so leg times accumulate exactly.
 '''
 class Truck:
+    __slots__ = ('capacity', 'distance', 'speed', 'packages', 'location', 'delivery_time', 'departure_time')
+
     def __init__(self, capacity, distance, speed, packages, location, delivery_time, departure_time):
         self.capacity = capacity              # Maximum number of packages the truck can carry
         self.distance = distance              # Total distance traveled so far
         self.speed = speed                    # Average speed of the truck (used for time calculation)
         self.packages = packages              # List of package IDs assigned to the truck
         self.location = location              # Current location of the truck
-        self.delivery_time = departure_time   # Current delivery time (initially set to departure time)
+        self.delivery_time = float(departure_time)  # Current delivery time (initially set to departure time)
         self.departure_time = departure_time  # Time the truck left the hub
 
     def __str__(self):